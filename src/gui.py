@@ -1,14 +1,30 @@
 from math import *
-from ion import *
-from time import sleep
-from kandinsky import *
+from time import sleep, monotonic
 
 EMULATED = False
 try: import os; EMULATED = True; print("Emulated")
 except: pass
 
+mem_alloc = None
+try: from gc import mem_alloc
+except: pass
+
+if EMULATED and getattr(os, "environ", {}).get("GUI_BACKEND") == "headless":
+  from headless import install; install()
+from ion import *
+from kandinsky import *
+
 class Config:
   DELAY_SEC_BETWEEN_RELEASE_CHECKS = 0.05
+  MAX_SPLIT_RECTS = 6
+  """A partly hidden rect is painted whole instead of split into more strips than this."""
+  IDLE_DELAY_SEC = 1.0
+  """Without input nor redraw for this long, `start()` polls at `IDLE_TPS` instead of `TPS`."""
+  IDLE_TPS = 20
+  TICK_BUDGET_SEC = 0.008
+  """Tasks started with `spawn()` get no more steps in a tick once it has been busy this long."""
+  TICK_MAX_TASK_STEPS = 64
+  """Steps of tasks per tick at most, even when the clock doesn't move, like on a virtual clock."""
 
 SPACEMENT_X = 2
 SPACEMENT_Y = 4
@@ -20,6 +36,9 @@ MOVES = {
   KEY_RIGHT: (1, 0),
   KEY_LEFT: (-1, 0)
 }
+MOVE_KEYS = list(MOVES)
+"""Keys of `MOVES`, indexed like the directions of the navigation graph."""
+NAVIGATION_KEYS = MOVE_KEYS + [KEY_EXE, KEY_OK]
 TPS = 100
 _VARIANT_DELIMITER = "/"
 
@@ -49,6 +68,23 @@ class ColorName(str):
     return self.specified("enabled", enabled)
   def focused(self, enabled: bool = True) -> "ColorName":
     return self.specified("focused", enabled)
+  
+  def for_state(self, state: int) -> "ColorName":
+    """Returns the variant matching the `State` bitmask `state`."""
+    if state & State.FOCUSED:
+      return self.focused()
+    return self.uneditable(state & State.UNEDITABLE).hovered(state & State.HOVERED).enabled(state & State.ENABLED)
+
+class State:
+  """
+  Bits of a widget's state, in the same order as color variants.
+  A widget's state indexes the tables returned by `Style.table()`.
+  """
+  UNEDITABLE = 1
+  HOVERED = 2
+  ENABLED = 4
+  FOCUSED = 8
+  COUNT = 16
 
 class Colors:
   text = ColorName("text")
@@ -71,18 +107,66 @@ class Style:
   class ColorNotFound(Exception):
     pass
   
+  _generation: int = 0
+  """Bumped whenever a color or the base style changes, invalidating every cache."""
+  
   def __init__(self, fallback: "Style" = None, colors: dict[str, "ColorOutput"] = {}) -> None:
     self.fallback: Style = fallback if fallback else _BASE_STYLE
+    self._cache: dict[str, "ColorOutput"] = {}
+    self._tables: dict[str, list["ColorOutput"]] = {}
+    self._cache_generation: int = Style._generation
+    self.cache_hits: int = 0
+    self.cache_misses: int = 0
     for name in colors:
-      setattr(self, str(name), colors[name])
+      self.set(name, colors[name])
+  
+  def set(self, color_name: str, color: "ColorOutput") -> None:
+    """
+    Defines the color associated to `color_name`. Use this instead of setting
+    the attribute directly so that resolved colors get recomputed.
+    """
+    setattr(self, str(color_name), color)
+    Style._generation += 1
   
   def get(self, color_name: str) -> "ColorOutput":
     """
     Returns the color associated to the given `color_name`.
     `color_name` can be composed like "border/hovered" to fallback on "border"
     if no variant is defined for the hovered state.
+    Resolved colors are cached until a color is set on any style.
+    """
+    
+    self._check_cache()
+    
+    if color_name in self._cache:
+      self.cache_hits += 1
+      return self._cache[color_name]
+    
+    self.cache_misses += 1
+    color = self._resolve(color_name)
+    self._cache[color_name] = color
+    return color
+  
+  def table(self, color_name: ColorName) -> list["ColorOutput"]:
+    """
+    Returns the colors of `color_name` for every `State` bitmask, so that
+    looking up a widget's color is a single index operation.
     """
+    self._check_cache()
     
+    table = self._tables.get(color_name)
+    if table is None:
+      table = [self.get(color_name.for_state(state)) for state in range(State.COUNT)]
+      self._tables[color_name] = table
+    return table
+  
+  def _check_cache(self) -> None:
+    if self._cache_generation != Style._generation:
+      self._cache = {}
+      self._tables = {}
+      self._cache_generation = Style._generation
+  
+  def _resolve(self, color_name: str) -> "ColorOutput":
     if hasattr(self, str(color_name)):
       color = getattr(self, str(color_name))
       if isinstance(color, str):
@@ -106,6 +190,8 @@ class Style:
 
 def set_base_style(new_style: Style) -> None:
   global _BASE_STYLE
+  if new_style is not _BASE_STYLE:
+    Style._generation += 1
   _BASE_STYLE = new_style
 
 # Use Numworks' palette: https://github.com/numworks/epsilon/blob/master/apps/elements/palette.h
@@ -158,14 +244,20 @@ layout: list[list["CanvasItem"]] = []
 # focused_text_box = None
 
 class Vector2():
+  __slots__ = ("x", "y")
+  
   def __init__(self, x: int = 0, y: int = 0):
-    assert type(x) == int
-    assert type(y) == int
     self.x: int = x
     self.y: int = y
 
   def duplicate(self) -> "Vector2":
     return Vector2(self.x, self.y)
+  
+  def set(self, x: int, y: int) -> "Vector2":
+    """Moves this vector in place, to avoid allocating a new one."""
+    self.x = x
+    self.y = y
+    return self
 
   def __getitem__(self, idx):
     if idx == 0:
@@ -173,15 +265,19 @@ class Vector2():
     elif idx == 1:
       return self.y
 
-    return IndexError
+    raise IndexError(idx)
 
   def __add__(self, __o):
-    try:
-      return Vector2(self.x + __o[0], self.y + __o [1])
-    except Exception as error:
-      raise error
+    return Vector2(self.x + __o[0], self.y + __o[1])
+  
+  def __iadd__(self, __o):
+    self.x += __o[0]
+    self.y += __o[1]
+    return self
 
   def __eq__(self, __o: object) -> bool:
+    if isinstance(__o, Vector2):
+      return self.x == __o.x and self.y == __o.y
     return self.x == __o[0] and self.y == __o[1]
 
   def __str__(self) -> str:
@@ -195,34 +291,271 @@ def add_overlay(size: Vector2) -> Vector2:
   return size + (2, 2)
 
 
-def wait_released(key) -> None:
-  while keydown(key):
-    sleep(Config.DELAY_SEC_BETWEEN_RELEASE_CHECKS)
+Rect = tuple
+"""A screen area as (x, y, width, height), like `fill_rect()` arguments. MicroPython can't subscript `tuple`."""
 
-def repeat_while_pressed(callback, key: int, delay_sec: float = 0.05) -> None:
-  while keydown(key):
-    callback()
-    sleep(delay_sec)
+def rect_intersects(a: Rect, b: Rect) -> bool:
+  return a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
 
-def delay_repeat(callback, key: int, first_press_delay_sec: float = 0.5, repeat_delay_sec: float = 0.05) -> None:
-  for __ in range(int(first_press_delay_sec/Config.DELAY_SEC_BETWEEN_RELEASE_CHECKS)):
-    sleep(Config.DELAY_SEC_BETWEEN_RELEASE_CHECKS)
-    if not keydown(key):
-      return
+def rect_union(a: Rect, b: Rect) -> Rect:
+  x = min(a[0], b[0])
+  y = min(a[1], b[1])
+  return (x, y, max(a[0] + a[2], b[0] + b[2]) - x, max(a[1] + a[3], b[1] + b[3]) - y)
+
+def rect_subtract(rect: Rect, hole: Rect) -> list[Rect]:
+  """Returns up to 4 rects covering `rect` without `hole`."""
+  if not rect_intersects(rect, hole):
+    return [rect]
+  
+  x, y, w, h = rect
+  right = x + w
+  bottom = y + h
+  hole_left = max(x, hole[0])
+  hole_top = max(y, hole[1])
+  hole_right = min(right, hole[0] + hole[2])
+  hole_bottom = min(bottom, hole[1] + hole[3])
+  
+  result = []
+  if hole_top > y:
+    result.append((x, y, w, hole_top - y))
+  if hole_bottom < bottom:
+    result.append((x, hole_bottom, w, bottom - hole_bottom))
+  if hole_left > x:
+    result.append((x, hole_top, hole_left - x, hole_bottom - hole_top))
+  if hole_right < right:
+    result.append((hole_right, hole_top, right - hole_right, hole_bottom - hole_top))
+  return result
+
+
+_frame_ops: list[tuple] = None
+"""Operations recorded since `begin_frame()`, None when painting immediately."""
+_frame_clip: list[Rect] = None
+"""Disjoint areas recorded operations are restricted to, None for the whole screen."""
+
+def begin_frame(clip: list[Rect] = None) -> None:
+  """
+  Starts recording `paint_rect()` and `paint_string()` calls until `end_frame()`.
+  With `clip`, only the parts of the operations inside its rects are kept.
+  """
+  global _frame_ops, _frame_clip
+  if _frame_ops is None:
+    _frame_ops = []
+    _frame_clip = clip
+
+def paint_rect(x: int, y: int, width: int, height: int, color: "ColorOutput") -> None:
+  if _frame_ops is None:
+    fill_rect(x, y, width, height, color)
+  elif width <= 0 or height <= 0:
+    return
+  elif _frame_clip is None:
+    _frame_ops.append(((x, y, width, height), color, None, None))
+  else:
+    for clip in _frame_clip:
+      left = max(x, clip[0])
+      top = max(y, clip[1])
+      right = min(x + width, clip[0] + clip[2])
+      bottom = min(y + height, clip[1] + clip[3])
+      if left < right and top < bottom:
+        _frame_ops.append(((left, top, right - left, bottom - top), color, None, None))
+
+def paint_string(txt: str, x: int, y: int, color: "ColorOutput", background: "ColorOutput") -> None:
+  """Clipped strings keep the characters whose cell touches the clip, whole."""
+  if _frame_ops is None:
+    draw_string(txt, x, y, color, background)
+  elif not txt:
+    return
+  elif _frame_clip is None:
+    _frame_ops.append(((x, y, len(txt) * 10, CHAR_HEIGHT), color, txt, background))
+  else:
+    for clip in _frame_clip:
+      if clip[1] >= y + CHAR_HEIGHT or clip[1] + clip[3] <= y:
+        continue
+      first = max(0, (clip[0] - x) // 10)
+      last = min(len(txt), (clip[0] + clip[2] - x + 9) // 10)
+      if first < last:
+        _frame_ops.append(((x + first * 10, y, (last - first) * 10, CHAR_HEIGHT), color, txt[first:last], background))
+
+def end_frame() -> None:
+  """
+  Paints the recorded operations in order, skipping the ones a later
+  operation fully hides and splitting partly hidden rects (like a border
+  under its fill) into the strips that remain visible.
+  """
+  global _frame_ops, _frame_clip
+  ops = _frame_ops
+  _frame_ops = _frame_clip = None
+  if not ops:
+    return
+  
+  covered: list[Rect] = []
+  pieces: list[list[Rect]] = [None] * len(ops)
+  for i in range(len(ops) - 1, -1, -1):
+    rect = ops[i][0]
+    visible = [rect]
+    for cover in covered:
+      visible = [piece for part in visible for piece in rect_subtract(part, cover)]
+      if not visible:
+        break
+    if visible:
+      # Strings can't be split, they are painted whole and overwritten later.
+      pieces[i] = visible if ops[i][2] is None and len(visible) <= Config.MAX_SPLIT_RECTS else [rect]
+    covered.append(rect)
+  
+  for i in range(len(ops)):
+    if pieces[i] is None:
+      continue
+    rect, color, txt, background = ops[i]
+    if txt is None:
+      for piece in pieces[i]:
+        fill_rect(piece[0], piece[1], piece[2], piece[3], color)
+    else:
+      draw_string(txt, rect[0], rect[1], color, background)
+
+
+_key_states = bytearray(64)
+"""Per key code: bit 0 is set if held at the last scan, bit 1 if held at the one before."""
+_scanned_keys: list[int] = []
+_key_repeat_at: list[float] = [0.0] * 64
+"""Per key code: time at which a held key fires its next repeat."""
+_scan_time: float = 0.0
+_scan_count: int = 0
+"""Calls to `scan_keys()`, one per tick of `start()`."""
+_recorded_input: list[tuple] = None
+_recorded_held = bytearray(64)
+_recorded_since: float = 0.0
+
+def record_input() -> list[tuple]:
+  """
+  Starts recording the scanned keys, and returns the list where
+  (tick, key, held, seconds) is appended each time one is pressed or
+  released, seconds being the scan time since the first recorded scan, as
+  key repeats depend on it. Print it to replay the session with
+  `headless.Replay` on a computer.
+  """
+  global _recorded_input, _scan_count
+  _recorded_input = []
+  _scan_count = 0
+  for key in range(len(_recorded_held)):
+    _recorded_held[key] = 0
+  return _recorded_input
+
+def stop_recording_input() -> list[tuple]:
+  global _recorded_input
+  recorded = _recorded_input
+  _recorded_input = None
+  return recorded
+
+def _record_scan(keys: list[int]) -> None:
+  global _recorded_since
+  if _scan_count == 0:
+    _recorded_since = _scan_time
+  for key in keys:
+    held = _key_states[key] & 1
+    if held != _recorded_held[key]:
+      _recorded_held[key] = held
+      _recorded_input.append((_scan_count, key, held == 1, _scan_time - _recorded_since))
+
+def scan_keys(keys: list[int]) -> bool:
+  """
+  Reads the state of `keys` once for this tick, see `key_held()`,
+  `key_pressed()` and `key_released()`. When a different list is scanned,
+  its keys don't report an edge on the first scan.
+  Returns whether any key is held or was just released.
+  """
+  global _scanned_keys, _scan_time, _scan_count
+  _scan_time = monotonic()
+  active = 0
+  if keys is not _scanned_keys:
+    for key in _scanned_keys:
+      _key_states[key] = 0
+    for key in keys:
+      _key_states[key] = 3 if keydown(key) else 0
+      active |= _key_states[key]
+    _scanned_keys = keys
+  else:
+    for key in keys:
+      _key_states[key] = (_key_states[key] << 1 & 2) | (1 if keydown(key) else 0)
+      active |= _key_states[key]
   
-  repeat_while_pressed(callback, key, repeat_delay_sec)
+  if _recorded_input is not None:
+    _record_scan(keys)
+  _scan_count += 1
+  return active != 0
+
+def key_held(key: int) -> bool:
+  return _key_states[key] & 1 == 1
+def key_pressed(key: int) -> bool:
+  """True on the tick `key` went down."""
+  return _key_states[key] == 1
+def key_released(key: int) -> bool:
+  """True on the tick `key` went up."""
+  return _key_states[key] == 2
+
+def key_repeated(key: int, first_press_delay_sec: float = 0.5, repeat_delay_sec: float = 0.05) -> bool:
+  """
+  True on the tick `key` went down, then every `repeat_delay_sec` once it
+  has been held for `first_press_delay_sec`. Must be checked every tick.
+  """
+  if key_pressed(key):
+    _key_repeat_at[key] = _scan_time + first_press_delay_sec
+    return True
+  if key_held(key) and _scan_time >= _key_repeat_at[key]:
+    _key_repeat_at[key] = _scan_time + repeat_delay_sec
+    return True
+  return False
+
+
+def wait_released(key) -> None:
+  flush_damage()
+  while keydown(key):
+    sleep(Config.DELAY_SEC_BETWEEN_RELEASE_CHECKS)
 
 def check_action(callback, key: int, first_press_delay_sec: float = 0.5, repeat_delay_sec: float = 0.05) -> None:
-  if keydown(key):
+  """Calls `callback` on the ticks `key_repeated()` fires. Never blocks."""
+  if key_repeated(key, first_press_delay_sec, repeat_delay_sec):
     callback()
-    delay_repeat(callback, key, first_press_delay_sec, repeat_delay_sec)
 
 
 class CanvasItem():
-  def __init__(self, position: Vector2 = Vector2(10, 10), callback = lambda: None, style: Style = None) -> None:
-    self.position = position
+  __slots__ = ("position", "style", "callback", "state", "navigable", "_size", "_row", "_nav_index", "_change_queued")
+  _STATE_MASK: int = 0
+  """`State` bits the colors of this class depend on."""
+  _STATE_FLAGS: int = 0
+  """`State` bits always set for this class."""
+  _PAINT_COLORS: tuple = (Colors.border, Colors.background, Colors.text)
+  """Colors `draw()` uses, the first one only for the outline."""
+  
+  def __init__(self, position: Vector2 = None, callback = lambda: None, style: Style = None) -> None:
+    self.position = Vector2(10, 10) if position is None else position
+    """Moved in place by the layout, don't share it between items."""
     self.style = style
     self.callback = callback
+    self.state: int = 0
+    self.navigable: bool = True
+    """False for items that hover moves skip, like disabled ones. Call `invalidate_navigation()` after changing it."""
+    self._size: Vector2 = None
+    self._row: list[CanvasItem] = None
+    """The `layout` row this item is placed in, if any."""
+    self._nav_index: int = 0
+    self._change_queued: bool = False
+  
+  def notify_change(self) -> None:
+    """Queues a call to `callback` before the next frame, see `flush_changes()`."""
+    if not self._change_queued:
+      self._change_queued = True
+      _changes.append(self)
+  
+  def fire_change(self) -> None:
+    """Called by `flush_changes()` for a queued change."""
+    self.callback()
+  
+  def result(self):
+    """Value of this item in the form results, None if it has none."""
+    return None
+  
+  def reset_result(self, value) -> None:
+    """Virtual, sets this item back to `value`, a former `result()`. Does nothing by default."""
+    pass
   
   def draw(self, pos: Vector2 = None) -> None:
     """Virtual"""
@@ -232,6 +565,43 @@ class CanvasItem():
     """Virtual"""
     raise NotImplementedError("get_size() is not implemented on " + repr(self))
   
+  def get_cached_size(self) -> Vector2:
+    """`get_size()`, computed again only after `invalidate_size()`."""
+    if self._size is None:
+      self._size = self.get_size()
+    return self._size
+  
+  def invalidate_size(self) -> None:
+    """Call when `get_size()` may have changed: the item's row is laid out again if needed."""
+    old_size = self._size
+    self._size = None
+    if self._row is None:
+      return
+    if old_size is None or old_size.x != self.get_cached_size().x:
+      layout_row_changed(self._row)
+    else:
+      self.mark_dirty()
+  
+  def get_rect(self) -> Rect:
+    """Screen area painted by `draw()`, outline included."""
+    size = self.get_cached_size()
+    return (self.position.x - 1, self.position.y - 1, size.x + 2, size.y + 2)
+  
+  def mark_dirty(self) -> None:
+    """Schedules a redraw of this item for the next frame, see `flush_damage()`."""
+    if self._row is not None:
+      damage(self.get_rect())
+  
+  def mark_border_dirty(self) -> None:
+    """Schedules a redraw of the outline only."""
+    if self._row is None:
+      return
+    x, y, width, height = self.get_rect()
+    damage((x, y, width, 1))
+    damage((x, y + height - 1, width, 1))
+    damage((x, y + 1, 1, height - 2))
+    damage((x + width - 1, y + 1, 1, height - 2))
+  
   def get_style_color(self, name: str) -> "ColorOutput":
     return self.get_style().get(name)
   
@@ -240,7 +610,38 @@ class CanvasItem():
   
   
   def get_color(self, color_name: ColorName):
-    return self.get_style_color(color_name)
+    return self.get_style().table(color_name)[self.state & self._STATE_MASK | self._STATE_FLAGS]
+  
+  def _set_state(self, bit: int, value: bool) -> None:
+    if value:
+      self.state |= bit
+    else:
+      self.state &= ~bit
+  
+  @property
+  def hovered(self) -> bool:
+    return bool(self.state & State.HOVERED)
+  @hovered.setter
+  def hovered(self, value: bool) -> None:
+    self._set_state(State.HOVERED, value)
+  
+  @property
+  def enabled(self) -> bool:
+    return bool(self.state & State.ENABLED)
+  @enabled.setter
+  def enabled(self, value: bool) -> None:
+    """Changing it on a placed item queues a change, see `notify_change()`."""
+    if value != self.enabled:
+      self._set_state(State.ENABLED, value)
+      if self._row is not None:
+        self.notify_change()
+  
+  @property
+  def focused(self) -> bool:
+    return bool(self.state & State.FOCUSED)
+  @focused.setter
+  def focused(self, value: bool) -> None:
+    self._set_state(State.FOCUSED, value)
   
   def handle_input(self) -> None:
     """Virtual"""
@@ -248,83 +649,297 @@ class CanvasItem():
 
 
 class Hoverable(CanvasItem):
+  __slots__ = ()
+  _STATE_MASK = State.HOVERED
+  
   def __init__(self, hovered: bool = False, *args, **kwargs) -> None:
     super().__init__(*args, **kwargs)
-    self.hovered: bool = False
-  
-  def get_color(self, color_name: ColorName):
-    return super().get_color(color_name.hovered(self.hovered))
+    self.hovered = False
 
 
 class Toggleable(CanvasItem):
+  __slots__ = ()
   _Togleable_locals = locals()
+  _STATE_MASK = State.ENABLED
   
   def __init__(self, enabled: bool = False, *args, **kwargs) -> None:
     super().__init__(*args, **kwargs)
-    self.enabled: bool = enabled
+    self.enabled = enabled
   
   def toggle(self):
     self.enabled = not self.enabled
-  
-  def get_color(self, color_name: ColorName):
-    return super().get_color(color_name.enabled(self.enabled))
 
 class TogleableAndHoverable(Toggleable, Hoverable):
+  __slots__ = ()
   _TogleableAndHoverable_locals = locals()
-  
-  def get_color(self, color_name: ColorName):
-    return super().get_color(color_name.hovered(self.hovered).enabled(self.enabled))
+  _STATE_MASK = State.HOVERED | State.ENABLED
 
 
 class Focusable(Hoverable):
   """Press EXE to focus and be the one to parse inputs. Press EXE again to leave focus."""
+  __slots__ = ()
+  _STATE_MASK = State.HOVERED | State.FOCUSED
+  INPUT_KEYS: list[int] = NAVIGATION_KEYS
+  """Keys scanned each tick while focused."""
+  
   def __init__(self, hovered: bool = False, *args, **kwargs) -> None:
     super().__init__(hovered, *args, **kwargs)
     self.focused = False
-  
-  def get_color(self, color_name: ColorName):
-    return self.get_style_color(color_name.focused()) if self.focused else super().get_color(color_name)
 
 
 class Label(Hoverable):
+  __slots__ = ("_txt",)
+  _STATE_FLAGS = State.UNEDITABLE
+  
   def __init__(self, txt: str = "Lorem Ipsum", *args, **kwargs):
     super().__init__(*args, **kwargs)
-    self.txt: str = txt
+    self.txt = txt
+  
+  @property
+  def txt(self) -> str:
+    return self._txt
+  @txt.setter
+  def txt(self, value: str) -> None:
+    """Setting the text redraws the label, and lays out its row again if its length changed."""
+    self._txt = value
+    self.invalidate_size()
+    if self.result() is not None:
+      _record_result(self)
 
   def get_size(self) -> Vector2:
     return txt_size(self.txt)
   
   def draw(self, pos: Vector2 = None):
     pos = pos or self.position
-    size = add_overlay(self.get_size())
-    fill_rect(
+    size = self.get_cached_size()
+    paint_rect(
       pos.x-1,
       pos.y-1,
-      size.x,
-      size.y,
+      size.x+2,
+      size.y+2,
       self.get_color(Colors.border)
     )
-    draw_string(
+    paint_string(
       self.txt,
       pos.x,
       pos.y,
       self.get_color(Colors.text),
       self.get_color(Colors.background),
     )
-  
-  def get_color(self, color_name: ColorName):
-    return super().get_color(color_name.uneditable())
 
 
 class Button(Label, TogleableAndHoverable):
+  __slots__ = ()
+  
   def __init__(self, txt: str, enabled: bool = False, *args, **kwargs):
     Label.__init__(self, txt, *args, **kwargs)
     Toggleable.__init__(self, enabled)
   
   fetch_members(TogleableAndHoverable._TogleableAndHoverable_locals, locals())
+  _STATE_MASK = TogleableAndHoverable._STATE_MASK
+  _STATE_FLAGS = 0
+  
+  def result(self):
+    return self.txt if self.enabled else None
+
+
+def wrap_lines(txt: str, start: int, columns: int) -> list[tuple[int, int]]:
+  """
+  Returns the (start, end) indexes in `txt` of the lines of at most
+  `columns` characters from `start` on, breaking at newlines, then at the
+  last space that fits, else inside the word. The breaking character is
+  part of no line. `columns` must be 1 at least.
+  """
+  lines: list[tuple[int, int]] = []
+  length = len(txt)
+  while start < length:
+    newline = txt.find("\n", start, start + columns + 1)
+    if newline >= 0:
+      lines.append((start, newline))
+      start = newline + 1
+    elif length - start <= columns:
+      lines.append((start, length))
+      start = length
+    else:
+      space = txt.rfind(" ", start, start + columns + 1)
+      end = space if space > start else start + columns
+      lines.append((start, end))
+      start = end + 1 if space > start else end
+  return lines
+
+class WrappedLabel(Label):
+  """
+  A label wrapped to `width` pixels, 10 at least, over `lines` lines. Text
+  past the last line is cut without any mark: make the label tall enough
+  for the longest text it shows. Each line is an item alone in its layout row: add
+  `*label.rows()` to the layout, the label itself being the first line.
+  The line breaks are computed again only when `txt` or `width` changes,
+  from the line before the first edited character, and only the lines
+  that changed are repainted.
+  """
+  __slots__ = ("line_items", "_columns", "_lines")
+
+  def __init__(self, txt: str = "Lorem Ipsum", width: int = 300, lines: int = 2, *args, **kwargs):
+    self.line_items: list[CanvasItem] = [self]
+    """The item drawing each line. Fixed, so that setting the text never moves other rows."""
+    self._columns: int = max(1, width // 10)
+    self._lines: list[tuple[int, int]] = []
+    """(start, end) of each line in `txt`, see `wrap_lines()`."""
+    self._txt = ""
+    super().__init__(txt, *args, **kwargs)
+    self.line_items += [WrappedLine(self, y) for y in range(1, lines)]
+
+  def rows(self) -> list[list[CanvasItem]]:
+    """The rows this label takes in a `layout`, one per line."""
+    return [[line_item] for line_item in self.line_items]
+
+  @property
+  def txt(self) -> str:
+    return self._txt
+  @txt.setter
+  def txt(self, value: str) -> None:
+    old_txt = self._txt
+    old_lines = self._lines
+    changed = 0
+    length = min(len(old_txt), len(value))
+    while changed < length and old_txt[changed] == value[changed]:
+      changed += 1
+    # Breaks before the line preceding the edit can't move.
+    y = 0
+    while y + 1 < len(old_lines) and old_lines[y + 1][0] <= changed:
+      y += 1
+    y = max(0, y - 1)
+    self._txt = value
+    self._lines = old_lines[:y] + wrap_lines(value, old_lines[y][0] if y < len(old_lines) else 0, self._columns)
+
+    for y in range(min(len(self.line_items), max(len(old_lines), len(self._lines)))):
+      old_line = old_txt[old_lines[y][0]:old_lines[y][1]] if y < len(old_lines) else ""
+      line = value[self._lines[y][0]:self._lines[y][1]] if y < len(self._lines) else ""
+      if old_line != line and self.line_items[y]._row is not None:
+        damage(self.line_items[y].get_rect())
+
+  @property
+  def width(self) -> int:
+    return self._columns * 10
+  @width.setter
+  def width(self, value: int) -> None:
+    self._columns = max(1, value // 10)
+    self._lines = wrap_lines(self._txt, 0, self._columns)
+    for line_item in self.line_items:
+      line_item.invalidate_size()
+
+  def get_size(self) -> Vector2:
+    return Vector2(self._columns * 10, CHAR_HEIGHT)
+
+  def mark_dirty(self) -> None:
+    # The other lines take their colors from this label.
+    super().mark_dirty()
+    for line_item in self.line_items[1:]:
+      line_item.mark_dirty()
+
+  def draw(self, pos: Vector2 = None):
+    self.draw_line(0, pos or self.position)
+
+  def draw_line(self, y: int, pos: Vector2) -> None:
+    size = self.get_cached_size()
+    background = self.get_color(Colors.background)
+    paint_rect(pos.x-1, pos.y-1, size.x+2, size.y+2, self.get_color(Colors.border))
+    paint_rect(pos.x, pos.y, size.x, size.y, background)
+    if y < len(self._lines):
+      start, end = self._lines[y]
+      paint_string(self._txt[start:end], pos.x, pos.y, self.get_color(Colors.text), background)
+
+class WrappedLine(CanvasItem):
+  """A line of a `WrappedLabel` after the first, drawn with its colors. Hover moves skip it."""
+  __slots__ = ("label", "line")
+
+  def __init__(self, label: WrappedLabel, line: int) -> None:
+    super().__init__()
+    self.label: WrappedLabel = label
+    self.line: int = line
+    self.navigable = False
+
+  def get_size(self) -> Vector2:
+    return self.label.get_cached_size()
+
+  def get_color(self, color_name: ColorName):
+    return self.label.get_color(color_name)
+
+  def draw(self, pos: Vector2 = None):
+    self.label.draw_line(self.line, pos or self.position)
+
+
+class GapBuffer:
+  """
+  Text edited at a caret. The free space (the gap) is kept at the caret,
+  so inserting and deleting there doesn't move the rest of the text.
+  Characters are kept one per item, so any text can be edited.
+  """
+  __slots__ = ("_data", "_gap_start", "_gap_end")
+  GROWTH: int = 16
+  
+  def __init__(self, txt: str = "") -> None:
+    self.set(txt)
+  
+  def set(self, txt: str) -> None:
+    """Replaces the text, the caret goes at its end."""
+    self._data: list[str] = list(txt) + [""] * self.GROWTH
+    self._gap_start: int = len(txt)
+    self._gap_end: int = len(self._data)
+  
+  def __len__(self) -> int:
+    return len(self._data) - self._gap_end + self._gap_start
+  
+  def __str__(self) -> str:
+    return self.slice(0, len(self))
+  
+  @property
+  def caret(self) -> int:
+    return self._gap_start
+  
+  def move_to(self, caret: int) -> None:
+    """Moves the caret, and the gap with it, by copying the text in between."""
+    caret = clamp(caret, 0, len(self))
+    gap = self._gap_end - self._gap_start
+    if caret < self._gap_start:
+      self._data[caret + gap:self._gap_end] = self._data[caret:self._gap_start]
+    elif caret > self._gap_start:
+      self._data[self._gap_start:caret] = self._data[self._gap_end:caret + gap]
+    self._gap_start = caret
+    self._gap_end = caret + gap
+  
+  def insert(self, char: str) -> None:
+    """Inserts `char` before the caret."""
+    if self._gap_start == self._gap_end:
+      grow = max(self.GROWTH, len(self._data))
+      self._data[self._gap_end:self._gap_end] = [""] * grow
+      self._gap_end += grow
+    self._data[self._gap_start] = char
+    self._gap_start += 1
+  
+  def delete(self) -> None:
+    """Deletes the character before the caret, if any."""
+    if self._gap_start:
+      self._gap_start -= 1
+  
+  def slice(self, start: int, end: int) -> str:
+    """Returns the characters from `start` (included) to `end` (excluded)."""
+    gap = self._gap_end - self._gap_start
+    if end <= self._gap_start:
+      part = self._data[start:end]
+    elif start >= self._gap_start:
+      part = self._data[start + gap:end + gap]
+    else:
+      part = self._data[start:self._gap_start] + self._data[self._gap_end:end + gap]
+    return "".join(part)
 
 
 class TextBox(Focusable):
+  """
+  Edits its text at the caret. A keystroke repaints only the characters it
+  moved and the caret, the whole field is repainted when it scrolls.
+  """
+  __slots__ = ("_text", "size", "_offset")
   _ADDITIONNAL_CHARS = {
     KEY_TOOLBOX: '"',
     # KEY_BACKSPACE: "%"", # TODO hhhhm
@@ -332,48 +947,78 @@ class TextBox(Focusable):
     KEY_ZERO: "?",
     KEY_DOT: ".",
   }
+  INPUT_KEYS = (
+    list(range(KEY_EXP, KEY_RIGHTPARENTHESIS + 1))
+    + list(range(KEY_FOUR, KEY_DIVISION + 1))
+    + list(range(KEY_ONE, KEY_PLUS + 1))
+    + [KEY_XNT, KEY_VAR, KEY_SHIFT, KEY_BACKSPACE]
+    + list(_ADDITIONNAL_CHARS)
+    + NAVIGATION_KEYS
+  )
   
   # TODO support digits
   def __init__(self, hovered = False, size: int = 10, *args, **kwargs):
     super().__init__(hovered, *args, **kwargs)
-    self.txt: str = ""
+    self._text: GapBuffer = GapBuffer()
     self.size: int = size
-    self.txt_pos: int = 0
+    self._offset: int = 0
+    """Index of the first visible character."""
+  
+  @property
+  def txt(self) -> str:
+    return str(self._text)
+  @txt.setter
+  def txt(self, value: str) -> None:
+    self._text.set(value)
+    self._offset = 0
+    self._scroll_to_caret()
+    self.mark_dirty()
+    self.notify_change()
+  
+  def result(self):
+    return self.txt
+  
+  def reset_result(self, value: str) -> None:
+    if value != self.txt:
+      self.txt = value
+  
+  @property
+  def txt_pos(self) -> int:
+    """Index of the caret in `txt`."""
+    return self._text.caret
+  @txt_pos.setter
+  def txt_pos(self, value: int) -> None:
+    old_column = self._text.caret - self._offset
+    self._text.move_to(value)
+    if self._scroll_to_caret():
+      self.mark_dirty()
+    else:
+      self._damage_columns(old_column, old_column + 1)
+      self._damage_columns(self._text.caret - self._offset, self._text.caret - self._offset + 1)
   
   def handle_input(self):
-    self._check_letters(KEY_EXP, KEY_RIGHTPARENTHESIS, "A" if keydown(KEY_SHIFT) else "a")
-    self._check_letters(KEY_FOUR, KEY_DIVISION, "R" if keydown(KEY_SHIFT) else "r")
-    self._check_letters(KEY_ONE, KEY_PLUS, "W" if keydown(KEY_SHIFT) else "w")
+    self._check_letters(KEY_EXP, KEY_RIGHTPARENTHESIS, "A" if key_held(KEY_SHIFT) else "a")
+    self._check_letters(KEY_FOUR, KEY_DIVISION, "R" if key_held(KEY_SHIFT) else "r")
+    self._check_letters(KEY_ONE, KEY_PLUS, "W" if key_held(KEY_SHIFT) else "w")
     
     self._check_letters(KEY_XNT, KEY_VAR, ":")
     for key, txt in self._ADDITIONNAL_CHARS.items():
-      if keydown(key):
-        self.txt += txt
-        self.txt_pos += 1
-        self.draw()
-        wait_released(key)
+      if key_pressed(key):
+        self.insert(txt)
         return
     
-    if keydown(KEY_LEFT):
-      self.txt_pos = max(0, self.txt_pos - 1)
-      self.draw()
-      wait_released(KEY_LEFT)
+    if key_pressed(KEY_LEFT):
+      self.txt_pos -= 1
       return
-    if keydown(KEY_RIGHT):
-      self.txt_pos = min(len(self.txt), self.txt_pos + 1)
-      self.draw()
-      wait_released(KEY_RIGHT)
+    if key_pressed(KEY_RIGHT):
+      self.txt_pos += 1
       return
     
-    if keydown(KEY_UP):
+    if key_pressed(KEY_UP):
       self.txt_pos = 0
-      self.draw()
-      wait_released(KEY_UP)
       return
-    if keydown(KEY_DOWN):
-      self.txt_pos = len(self.txt)
-      self.draw()
-      wait_released(KEY_DOWN)
+    if key_pressed(KEY_DOWN):
+      self.txt_pos = len(self._text)
       return
     
     check_action(self.delete_at_caret, KEY_BACKSPACE)
@@ -383,70 +1028,121 @@ class TextBox(Focusable):
 
   def draw(self, pos: Vector2 = None):
     pos = pos or self.position
-    size = self.get_size()
-    size_with_overlay = add_overlay(size)
-    offset: int = 0
-    if self.txt_pos > self.size:
-      offset = self.txt_pos - self.size
-    fill_rect(
+    size = self.get_cached_size()
+    offset: int = self._offset
+    paint_rect(
       pos.x-1,
       pos.y-1,
-      size_with_overlay.x,
-      size_with_overlay.y,
+      size.x+2,
+      size.y+2,
       self.get_color(Colors.border),
     )
-    fill_rect(
+    paint_rect(
       pos.x,
       pos.y,
       size.x,
       size.y,
       self.get_color(Colors.background),
     )
-    draw_string(
-      self.txt[offset:min(offset+self.size, len(self.txt))],
+    paint_string(
+      self._text.slice(offset, min(offset+self.size, len(self._text))),
       pos.x,
       pos.y,
       self.get_color(Colors.text),
       self.get_color(Colors.background),
     )
     if self.focused:
-      fill_rect(
-        pos.x + txt_len_size(self.txt_pos-offset).x,
+      paint_rect(
+        pos.x + (self._text.caret-offset)*10,
         pos.y,
         1,
         size.y,
         self.get_color(Colors.border),
       )
   
+  def insert(self, txt: str) -> None:
+    """Inserts `txt` at the caret, repainting the characters after it."""
+    column = self._text.caret - self._offset
+    for char in txt:
+      self._text.insert(char)
+    self.notify_change()
+    if self._scroll_to_caret():
+      self.mark_dirty()
+    else:
+      self._damage_columns(column, len(self._text) - self._offset + 1)
+  
   def delete_at_caret(self) -> None:
-    if not self.txt or self.txt_pos == 0:
+    if self._text.caret == 0:
       return
+    
+    column = self._text.caret - self._offset - 1
+    end = len(self._text) - self._offset + 1
+    self._text.delete()
+    self.notify_change()
+    if self._scroll_to_caret():
+      self.mark_dirty()
+    else:
+      self._damage_columns(column, end)
+  
+  def mark_border_dirty(self) -> None:
+    # The caret is painted with the border color.
+    if self.focused:
+      self.mark_dirty()
+    else:
+      super().mark_border_dirty()
   
-    self.txt = self.txt[:self.txt_pos-1] + self.txt[self.txt_pos:]
-    self.txt_pos -= 1
-    self.draw()
+  def _scroll_to_caret(self) -> bool:
+    """Scrolls so the caret is visible, returns whether the field scrolled."""
+    caret = self._text.caret
+    offset = self._offset
+    if caret < offset:
+      offset = caret
+    elif caret > offset + self.size:
+      offset = caret - self.size
+    offset = min(offset, max(0, len(self._text) - self.size))
+    if offset == self._offset:
+      return False
+    self._offset = offset
+    return True
+  
+  def _damage_columns(self, start: int, end: int) -> None:
+    """Marks the character cells of columns `start` (included) to `end` (excluded) to be repainted."""
+    if self._row is None:
+      return
+    start = max(0, start)
+    right = min(end * 10, self.size * 10 + 1)
+    if right > start * 10:
+      damage((self.position.x + start * 10, self.position.y, right - start * 10, CHAR_HEIGHT))
   
   def _check_letters(self, start: int, end: int, first_char) -> None:
     for key in range(start, end + 1):
-      if keydown(key):
-        self.txt += chr(key - start + ord(first_char))
-        self.txt_pos += 1
-        self.draw()
-        wait_released(key)
+      if key_pressed(key):
+        self.insert(chr(key - start + ord(first_char)))
         return
 
 
 class Slider(Focusable):
+  """
+  Value changes repaint only the old and new cursor footprints, and only
+  if the cursor moved a pixel. Changes made in the same tick paint one frame.
+  """
+  __slots__ = ("min", "max", "step", "_value", "size", "previous_value", "_drawn_cursor_x")
   SLIDER_HEIGHT: int = 4
   CURSOR_SIZE: int = 8
+  _PAINT_COLORS = (Colors.border, Colors.background, Colors.screen)
+  INPUT_KEYS = [KEY_SHIFT] + NAVIGATION_KEYS
   
   def __init__(self, min: float, max: float, step: float = 1, initial_value: float = None, size: int = 100, *args, **kwargs) -> None:
     super().__init__(*args, **kwargs)
     self.min: float = min
     self.max: float = max
     self.step: float = step
-    self.value: float = round((min + max) / 2 / step) * step if initial_value == None else initial_value
+    self._value: float = round((min + max) / 2 / step) * step if initial_value == None else initial_value
     self.size: int = size
+    self.previous_value: float = self._value
+    """`value` when `callback` was last called, to compare with in the callback."""
+    self._drawn_cursor_x: int = -1
+    """Cursor offset from the left of the track at the last `draw()`, -1 if not drawn yet."""
   
   def handle_input(self) -> None:
     check_action(self._decrease, KEY_LEFT)
@@ -455,58 +1151,110 @@ class Slider(Focusable):
   def get_size(self) -> Vector2:
     return Vector2(self.size, self.SLIDER_HEIGHT)
   
+  def get_rect(self) -> Rect:
+    return (self.position.x - 1, self.position.y, self.size + 2, canvas_items_height(1) + 1)
+  
   def draw(self, pos: Vector2 = None) -> None:
-    pos = (pos or self.position).duplicate()
-    size = self.get_size()
-    cursor_pos = pos + Vector2(int((self.value - self.min) / (self.max - self.min) * (size.x - self.CURSOR_SIZE)), int((canvas_items_height(1) - self.CURSOR_SIZE) / 2))
+    pos = pos or self.position
+    size = self.get_cached_size()
+    x: int = pos.x
+    y: int = pos.y
+    self._drawn_cursor_x = self._cursor_x()
+    cursor_x: int = x + self._drawn_cursor_x
+    cursor_y: int = y + int((canvas_items_height(1) - self.CURSOR_SIZE) / 2)
     
-    fill_rect(
-      pos.x-1,
-      pos.y,
-      size.x+1,
+    paint_rect(
+      x-1,
+      y,
+      size.x+2,
       canvas_items_height(1) + 1,
       self.get_color(Colors.screen)
     )
     
-    pos.y += int((canvas_items_height(1) - size.y) / 2)
+    y += int((canvas_items_height(1) - size.y) / 2)
     
-    fill_rect(
-      pos.x-1,
-      pos.y-1,
+    paint_rect(
+      x-1,
+      y-1,
       size.x+2,
       size.y+2,
       self.get_color(Colors.border)
     )
-    fill_rect(
-      pos.x,
-      pos.y,
+    paint_rect(
+      x,
+      y,
       size.x,
       size.y,
       self.get_color(Colors.background)
     )
-    fill_rect(
-      cursor_pos.x-1,
-      cursor_pos.y-1,
+    paint_rect(
+      cursor_x-1,
+      cursor_y-1,
       self.CURSOR_SIZE+2,
       self.CURSOR_SIZE+2,
       self.get_color(Colors.border)
     )
-    fill_rect(
-      cursor_pos.x,
-      cursor_pos.y,
+    paint_rect(
+      cursor_x,
+      cursor_y,
       self.CURSOR_SIZE,
       self.CURSOR_SIZE,
       self.get_color(Colors.background)
     )
     # draw_string(self.txt,pos.x,pos.y, default_hover_overlay if self.hovered else self.get_overlay(), default_enabled_color if self.enabled else self.get_color())
   
+  @property
+  def value(self) -> float:
+    return self._value
+  @value.setter
+  def value(self, value: float) -> None:
+    """Setting it repaints the cursor, and `callback` is called once before the next frame with the latest value."""
+    if value == self._value:
+      return
+    self._value = value
+    self.notify_change()
+    cursor_x = self._cursor_x()
+    if self._drawn_cursor_x < 0:
+      self.mark_dirty()
+    elif cursor_x != self._drawn_cursor_x:
+      # Against the last drawn cursor, so steps made before the next frame aren't painted.
+      self._damage_cursor(self._drawn_cursor_x)
+      self._damage_cursor(cursor_x)
+  
   def change_value_by(self, amount: float = 1) -> None:
+    """Changes `value`, within `min` and `max`."""
     self.value = clamp(self.value + amount,  self.min, self.max)
-    self.callback()
-    self.draw()
+  
+  def fire_change(self) -> None:
+    if self.value != self.previous_value:
+      self.callback()
+      self.previous_value = self.value
+  
+  def result(self):
+    return self.value
+  
+  def reset_result(self, value: float) -> None:
+    self.value = value
+  
+  def mark_border_dirty(self) -> None:
+    # The track and cursor outlines are inside the area.
+    self.mark_dirty()
+  
+  def _cursor_x(self) -> int:
+    return int((self.value - self.min) / (self.max - self.min) * (self.size - self.CURSOR_SIZE))
+  
+  def _damage_cursor(self, cursor_x: int) -> None:
+    """Marks the cursor footprint at `cursor_x`, outline included, to be repainted."""
+    if self._row is not None:
+      damage((
+        self.position.x + cursor_x - 1,
+        self.position.y + int((canvas_items_height(1) - self.CURSOR_SIZE) / 2) - 1,
+        self.CURSOR_SIZE + 2,
+        self.CURSOR_SIZE + 2,
+      ))
   
   def get_step(self) -> float:
-    return self.step * (10 if keydown(KEY_SHIFT) else 1)
+    return self.step * (10 if key_held(KEY_SHIFT) else 1)
   
   def _increase(self) -> None:
     self.change_value_by(self.get_step())
@@ -518,7 +1266,7 @@ class Slider(Focusable):
 def canvas_items_width(canvas_items: list[CanvasItem]) -> int:
   result: int = len(canvas_items) * (OUTLINE_SIZE + SPACEMENT_X) - SPACEMENT_X
   for canvas_item in canvas_items:
-    result += canvas_item.get_size().x
+    result += canvas_item.get_cached_size().x
   return result
 
 def canvas_items_height(canvas_items: int|list) -> int:
@@ -533,9 +1281,412 @@ def layout_get(position: Vector2) -> CanvasItem:
 def clamp(value, minimum, maximum) -> int:
   return max(min(value, maximum), minimum)
 def layout_clamp(position: Vector2) -> Vector2:
-  y = clamp(position[1], 0, len(layout) - 1)
-  x = clamp(position[0], 0, len(layout[y]) - 1)
-  return Vector2(x, y)
+  """Clamps `position` in place to an existing item of `layout`, and returns it."""
+  y = clamp(position.y, 0, len(layout) - 1)
+  return position.set(clamp(position.x, 0, len(layout[y]) - 1), y)
+
+
+class LazyRows:
+  """
+  Rows of a `layout` built on demand, so only the rows around the screen
+  have widgets in memory. `provider` is either a callable taking a row index,
+  in which case `count` is required, or a sequence of rows.
+  `release(y, row)` is called when a row is dropped, to save its values.
+  Rows can't be added or removed while shown.
+  """
+  
+  def __init__(self, provider, count: int = None, release = None) -> None:
+    self.provider = provider
+    self.count: int = len(provider) if count is None else count
+    self.release = release
+    self._rows: dict[int, list[CanvasItem]] = {}
+  
+  def __len__(self) -> int:
+    return self.count
+  
+  def __getitem__(self, y: int) -> list[CanvasItem]:
+    row = self._rows.get(y)
+    if row is None:
+      row = self._build(y)
+      self._rows[y] = row
+    return row
+  
+  def __iter__(self):
+    """Iterates over every row, building the missing ones without keeping them."""
+    for y in range(self.count):
+      yield self._rows.get(y) or self._build(y)
+  
+  def _build(self, y: int) -> list[CanvasItem]:
+    return self.provider(y) if callable(self.provider) else self.provider[y]
+  
+  def keep_only(self, start: int, end: int) -> None:
+    """Drops the rows outside of `start` (included) to `end` (excluded)."""
+    for y in list(self._rows):
+      if not start <= y < end:
+        row = self._rows.pop(y)
+        _results.pop(id(row), None)
+        for canvas_item in row:
+          canvas_item._row = None
+        if self.release:
+          self.release(y, row)
+
+
+ROW_PITCH: int = canvas_items_height(1) + SPACEMENT_Y
+VISIBLE_ROWS: int = (222 + SPACEMENT_Y) // ROW_PITCH
+"""Rows fitting on screen, taller layouts scroll."""
+
+_layout_top: int = 0
+_scroll_row: int = 0
+"""First visible row when the layout scrolls."""
+_window_start: int = 0
+_window_end: int = 0
+"""Rows from `_window_start` (included) to `_window_end` (excluded) are placed: visible ones and one more on each side."""
+_row_widths: dict[int, int] = {}
+"""Cached `canvas_items_width()` of each placed row."""
+layout_version: int = 0
+"""Incremented whenever rows or items are added or removed."""
+
+def row_top(y: int) -> int:
+  return _layout_top + y * ROW_PITCH
+
+def row_at(top: int) -> int:
+  """Index of the row placed at the screen ordinate `top`."""
+  return (top - _layout_top) // ROW_PITCH
+
+def row_rect(y: int) -> Rect:
+  """Screen band painted by the items of row `y`."""
+  return (0, row_top(y) - OUTLINE_SIZE, 320, canvas_items_height(1) + 2 * OUTLINE_SIZE)
+
+def placed_rows() -> range:
+  return range(_window_start, _window_end)
+
+def visible_rows() -> range:
+  """Rows on screen, the only ones drawn. The other placed rows are kept for navigation."""
+  if len(layout) <= VISIBLE_ROWS:
+    return range(len(layout))
+  return range(_scroll_row, _scroll_row + VISIBLE_ROWS)
+
+def place_row(y: int) -> None:
+  """Computes the positions of the items of row `y`, centered horizontally."""
+  row = layout[y]
+  width = canvas_items_width(row)
+  _row_widths[y] = width
+  x: int = 160 - width//2
+  top: int = row_top(y)
+  invalidate_navigation()
+  _track_results(row)
+  for canvas_item in row:
+    canvas_item._row = row
+    canvas_item.position.set(x, top)
+    x += canvas_item.get_cached_size().x + OUTLINE_SIZE + SPACEMENT_X
+
+def _set_window() -> None:
+  global _window_start, _window_end
+  if len(layout) <= VISIBLE_ROWS:
+    _window_start, _window_end = 0, len(layout)
+  else:
+    _window_start = max(0, _scroll_row - 1)
+    _window_end = min(len(layout), _scroll_row + VISIBLE_ROWS + 1)
+  if isinstance(layout, LazyRows):
+    layout.keep_only(_window_start, _window_end)
+
+def layout_all() -> None:
+  """
+  Lays out the rows around the screen, centering the whole `layout`
+  vertically, or the visible rows if it doesn't fit on screen.
+  """
+  global _layout_top, _scroll_row, _row_widths, layout_version
+  if len(layout) <= VISIBLE_ROWS:
+    _scroll_row = 0
+    _layout_top = 111 - canvas_items_height(len(layout))//2
+  else:
+    _scroll_row = clamp(_scroll_row, 0, len(layout) - VISIBLE_ROWS)
+    _layout_top = 111 - canvas_items_height(VISIBLE_ROWS)//2 - _scroll_row * ROW_PITCH
+  _set_window()
+  _row_widths = {}
+  for y in placed_rows():
+    place_row(y)
+  layout_version += 1
+
+def scroll_to(y: int) -> None:
+  """
+  Scrolls by a page so that row `y` is visible, and repaints the screen.
+  Kandinsky can't move pixels, so every row entering the screen is redrawn,
+  rows outside of it never are.
+  """
+  global _scroll_row
+  if len(layout) <= VISIBLE_ROWS or _scroll_row <= y < _scroll_row + VISIBLE_ROWS:
+    return
+  if y < _scroll_row:
+    _scroll_row = y - VISIBLE_ROWS + 1
+  else:
+    _scroll_row = y
+  layout_all()
+  damage((0, 0, 320, 222))
+
+def layout_index(row: list[CanvasItem]) -> int:
+  for y in placed_rows():
+    if layout[y] is row:
+      return y
+  return -1
+
+def layout_row_changed(row: list[CanvasItem]) -> None:
+  """Lays out `row` again and repaints it."""
+  y = layout_index(row)
+  if y < 0:
+    return
+  place_row(y)
+  damage(row_rect(y))
+
+def layout_relayout_from(y: int, old_count: int) -> None:
+  """
+  Lays out and repaints the rows from `y` down to the bottom of the screen,
+  after rows were added or removed from `old_count` rows. When the layout
+  starts or stops scrolling, it is all laid out and repainted instead.
+  """
+  if (old_count > VISIBLE_ROWS) != (len(layout) > VISIBLE_ROWS):
+    layout_all()
+    damage((0, 0, 320, 222))
+    return
+  _set_window()
+  for i in list(_row_widths):
+    if i >= y:
+      del _row_widths[i]
+  for i in range(max(y, _window_start), _window_end):
+    place_row(i)
+  top = row_top(y) - OUTLINE_SIZE
+  damage((0, top, 320, 222 - top))
+
+def layout_insert(y: int, x: int, canvas_item: CanvasItem) -> None:
+  layout[y].insert(x, canvas_item)
+  _results.pop(id(layout[y]), None)
+  _mutated()
+  layout_row_changed(layout[y])
+
+def layout_remove(canvas_item: CanvasItem) -> None:
+  row = canvas_item._row
+  row.remove(canvas_item)
+  canvas_item._row = None
+  _results.pop(id(row), None)
+  _mutated()
+  layout_row_changed(row)
+
+def layout_add_row(row: list[CanvasItem], y: int = None) -> None:
+  """
+  Inserts `row` at index `y`, or after the last row. Rows keep their place on
+  screen, the new row and the ones below it are laid out again.
+  """
+  if y is None:
+    y = len(layout)
+  layout.insert(y, row)
+  _mutated()
+  layout_relayout_from(y, len(layout) - 1)
+
+def layout_remove_row(y: int) -> None:
+  for canvas_item in layout[y]:
+    canvas_item._row = None
+  _results.pop(id(layout[y]), None)
+  layout.pop(y)
+  _mutated()
+  layout_relayout_from(y, len(layout) + 1)
+
+def _mutated() -> None:
+  global layout_version
+  layout_version += 1
+  invalidate_navigation()
+
+
+_nav_items: list[CanvasItem] = []
+_nav_neighbors: list[int] = []
+"""`_nav_neighbors[i*len(MOVE_KEYS) + d]` is the index in `_nav_items` of where moving from item `i` in direction `d` leads."""
+_nav_valid: bool = False
+
+def invalidate_navigation() -> None:
+  """The navigation graph will be built again before the next move."""
+  global _nav_valid
+  _nav_valid = False
+
+def _center_x(canvas_item: CanvasItem) -> int:
+  return canvas_item.position.x + canvas_item.get_cached_size().x//2
+
+def _nearest(y: int, x: int, dx: int, dy: int) -> CanvasItem:
+  """Finds the closest navigable item from `layout[y][x]` in a direction, or the item itself."""
+  if dy == 0:
+    i = x + dx
+    while 0 <= i < len(layout[y]):
+      if layout[y][i].navigable:
+        return layout[y][i]
+      i += dx
+    return layout[y][x]
+  
+  center = _center_x(layout[y][x])
+  i = y + dy
+  while _window_start <= i < _window_end:
+    best = None
+    best_distance = 0
+    for candidate in layout[i]:
+      distance = abs(_center_x(candidate) - center)
+      if candidate.navigable and (best is None or distance < best_distance):
+        best = candidate
+        best_distance = distance
+    if best is not None:
+      return best
+    i += dy
+  return layout[y][x]
+
+def build_navigation() -> None:
+  """
+  Precomputes, for every item, the item reached by each move: the next
+  navigable item on the same row, or the one of the closest row above or
+  below whose center is the closest horizontally.
+  """
+  global _nav_items, _nav_neighbors, _nav_valid
+  _nav_items = []
+  for y in placed_rows():
+    for canvas_item in layout[y]:
+      canvas_item._nav_index = len(_nav_items)
+      _nav_items.append(canvas_item)
+  
+  _nav_neighbors = []
+  for y in placed_rows():
+    for x in range(len(layout[y])):
+      for key in MOVE_KEYS:
+        _nav_neighbors.append(_nearest(y, x, MOVES[key][0], MOVES[key][1])._nav_index)
+  _nav_valid = True
+
+def navigate(canvas_item: CanvasItem, direction: int) -> CanvasItem:
+  """Returns the item reached by moving from `canvas_item` toward `MOVE_KEYS[direction]`."""
+  if not _nav_valid:
+    build_navigation()
+  return _nav_items[_nav_neighbors[canvas_item._nav_index * len(MOVE_KEYS) + direction]]
+
+def first_navigable() -> CanvasItem:
+  for y in placed_rows():
+    for canvas_item in layout[y]:
+      if canvas_item.navigable:
+        return canvas_item
+  return layout[_window_start][0]
+
+
+_changes: list[CanvasItem] = []
+"""Items whose `callback` is due, see `CanvasItem.notify_change()`."""
+
+def flush_changes() -> None:
+  """
+  Calls the callback of each changed item once, however many times it
+  changed since the last call. `start()` calls it before painting each frame.
+  Changes made by the callbacks themselves are left for the next call.
+  """
+  for i in range(len(_changes)):
+    canvas_item = _changes.pop(0)
+    canvas_item._change_queued = False
+    canvas_item.fire_change()
+    _record_result(canvas_item)
+
+
+_results: dict[int, tuple] = {}
+"""`id(row)` -> (row, result of each item) for the rows placed since `start()`, on any page."""
+_result_changes: list[tuple] = []
+"""(row, column, value) changes of results not yet streamed by `run()`."""
+
+def _track_results(row: list[CanvasItem]) -> None:
+  """Records the current results of `row`, if it isn't yet since `start()`."""
+  if id(row) not in _results:
+    _results[id(row)] = (row, [canvas_item.result() for canvas_item in row])
+
+def _record_result(canvas_item: CanvasItem) -> None:
+  row = canvas_item._row
+  if row is None or id(row) not in _results:
+    return
+  values = _results[id(row)][1]
+  x = row.index(canvas_item)
+  value = canvas_item.result()
+  if values[x] != value:
+    values[x] = value
+    y = layout_index(row)
+    if y >= 0:
+      _result_changes.append((y, x, value))
+
+
+_damage: list[Rect] = []
+
+def damage(rect: Rect) -> None:
+  """Marks a screen area to be repainted by the next `flush_damage()`."""
+  left = max(0, rect[0])
+  top = max(0, rect[1])
+  right = min(320, rect[0] + rect[2])
+  bottom = min(222, rect[1] + rect[3])
+  if right <= left or bottom <= top:
+    return
+  rect = (left, top, right - left, bottom - top)
+  
+  i = 0
+  while i < len(_damage):
+    if rect_intersects(_damage[i], rect):
+      rect = rect_union(_damage.pop(i), rect)
+      i = 0
+    else:
+      i += 1
+  _damage.append(rect)
+
+def flush_damage() -> bool:
+  """
+  Repaints every damaged area once: each canvas item touching it is drawn
+  a single time, clipped to the damage, and only the uncovered parts are
+  cleared to the screen color. Returns whether anything was painted.
+  """
+  if not _damage:
+    return False
+  
+  rects = _damage[:]
+  _damage.clear()
+  begin_frame(rects)
+  to_draw: list[CanvasItem] = []
+  screen_color = _BASE_STYLE.get(Colors.screen)
+  for rect in rects:
+    uncovered = [rect]
+    for y in visible_rows():
+      for canvas_item in layout[y]:
+        item_rect = canvas_item.get_rect()
+        if rect_intersects(rect, item_rect):
+          if canvas_item not in to_draw:
+            to_draw.append(canvas_item)
+          uncovered = [piece for part in uncovered for piece in rect_subtract(part, item_rect)]
+    for part in uncovered:
+      paint_rect(part[0], part[1], part[2], part[3], screen_color)
+  
+  for canvas_item in to_draw:
+    if Profile.enabled:
+      Profile.count_draw(canvas_item)
+    canvas_item.draw()
+  end_frame()
+  return True
+
+def switch_style(new_style: Style) -> None:
+  """
+  Makes `new_style` the base style and repaints only what it changes: the
+  items whose colors differ, only their outline if nothing else differs,
+  and the screen around items only if the screen color differs.
+  """
+  canvas_items = [canvas_item for y in visible_rows() for canvas_item in layout[y]]
+  old_colors = [[canvas_item.get_color(name) for name in canvas_item._PAINT_COLORS] for canvas_item in canvas_items]
+  old_screen = _BASE_STYLE.get(Colors.screen)
+  set_base_style(new_style)
+  
+  screen_parts = [(0, 0, 320, 222)] if _BASE_STYLE.get(Colors.screen) != old_screen else []
+  for i in range(len(canvas_items)):
+    canvas_item = canvas_items[i]
+    names = canvas_item._PAINT_COLORS
+    changed = [canvas_item.get_color(names[j]) != old_colors[i][j] for j in range(len(names))]
+    if True in changed[1:]:
+      canvas_item.mark_dirty()
+    elif changed[0]:
+      canvas_item.mark_border_dirty()
+    if screen_parts:
+      item_rect = canvas_item.get_rect()
+      screen_parts = [piece for part in screen_parts for piece in rect_subtract(part, item_rect)]
+  for part in screen_parts:
+    damage(part)
 
 def example() -> None:
   global layout
@@ -544,7 +1695,6 @@ def example() -> None:
   label = Label("XX")
   def slider_callback():
     label.txt = "{0:2d}".format(slider.value)
-    label.draw()
   
   slider.callback = slider_callback
   slider_callback()
@@ -558,102 +1708,585 @@ def example() -> None:
 
 
 def parse_result() -> list[list]:
+  """
+  Returns the results of each row of `layout`: enabled buttons' text,
+  sliders' value and text boxes' text. Rows shown since `start()` are read
+  from the recorded results, the others from their items.
+  """
+  return _parse_rows(layout)
+
+def _parse_rows(rows) -> list[list]:
   result = []
-  for row in layout:
-    row_result = []
-    result.append(row_result)
-    for canvas_item in row:
-      if isinstance(canvas_item, Button):
-        if canvas_item.enabled:
-          row_result.append(canvas_item.txt)
-      elif isinstance(canvas_item, Slider):
-        row_result.append(canvas_item.value)
-      elif isinstance(canvas_item, TextBox):
-        row_result.append(canvas_item.txt)
+  for row in rows:
+    recorded = _results.get(id(row))
+    values = recorded[1] if recorded and recorded[0] is row else [canvas_item.result() for canvas_item in row]
+    result.append([value for value in values if value is not None])
 
   return result
 
 
-def start():
-  fill_rect(0, 0, 320, 222, _BASE_STYLE.get(Colors.screen))
+class TickTiming:
+  """
+  Timing of the ticks of the last `start()`, and their heap allocations
+  where `gc.mem_alloc()` exists (MicroPython), to see when GC pauses come.
+  """
+  ticks: int = 0
+  idle_ticks: int = 0
+  """Ticks run at `Config.IDLE_TPS`."""
+  busy_sec: float = 0.0
+  """Time spent working, excluding sleeps."""
+  max_busy_sec: float = 0.0
+  last_busy_sec: float = 0.0
+  alloc_bytes: int = 0
+  """Bytes allocated by all ticks, ticks during which a collection ran excluded."""
+  max_alloc_bytes: int = 0
+  last_alloc_bytes: int = 0
+  
+  @staticmethod
+  def reset() -> None:
+    TickTiming.ticks = TickTiming.idle_ticks = 0
+    TickTiming.busy_sec = TickTiming.max_busy_sec = TickTiming.last_busy_sec = 0.0
+    TickTiming.alloc_bytes = TickTiming.max_alloc_bytes = TickTiming.last_alloc_bytes = 0
+  
+  @staticmethod
+  def record(busy_sec: float, idle: bool, alloc_bytes: int = 0) -> None:
+    if alloc_bytes > 0:
+      TickTiming.alloc_bytes += alloc_bytes
+      TickTiming.last_alloc_bytes = alloc_bytes
+      if alloc_bytes > TickTiming.max_alloc_bytes:
+        TickTiming.max_alloc_bytes = alloc_bytes
+    else:
+      TickTiming.last_alloc_bytes = 0
+    TickTiming.ticks += 1
+    if idle:
+      TickTiming.idle_ticks += 1
+    TickTiming.busy_sec += busy_sec
+    TickTiming.last_busy_sec = busy_sec
+    if busy_sec > TickTiming.max_busy_sec:
+      TickTiming.max_busy_sec = busy_sec
+
+
+class Profile:
+  """
+  Counters of what `start()` spends its time on, off by default. While
+  enabled, `fill_rect()`, `draw_string()`, `keydown()` and `Style.get()`
+  are replaced by counting versions, so disabled profiling costs nothing.
+  Totals cover the last `start()`, first paint included: read them or print
+  `report()` once it returns.
+  """
+  INPUT = 0
+  CALLBACKS = 1
+  """Includes the time spent by `on_change()`, or by the caller of `run()`, on yielded results."""
+  TASKS = 2
+  """Steps of the tasks started with `spawn()`."""
+  DRAW = 3
+  TRACE_FIELDS = ("tick", "input_sec", "callbacks_sec", "tasks_sec", "draw_sec", "fill_rect", "draw_string", "pixels", "Style.get", "keydown", "draw")
+  """Fields of each tuple of `trace`, the counts being those of the tick."""
+
+  enabled: bool = False
+  ticks: int = 0
+  fill_rects: int = 0
+  draw_strings: int = 0
+  pixels: int = 0
+  """Area painted by `fill_rect()` and `draw_string()`, overdraw included."""
+  style_gets: int = 0
+  max_style_depth: int = 0
+  """Deepest nesting of `Style.get()` calls resolving a color through fallbacks and variants."""
+  keydowns: int = 0
+  draws: int = 0
+  class_draws: dict[str, int] = {}
+  """Class name -> `draw()` calls on its instances."""
+  phase_sec: list[float] = [0.0, 0.0, 0.0, 0.0]
+  """Time spent in each phase of the ticks, indexed by `INPUT`, `CALLBACKS`, `TASKS` and `DRAW`."""
+  trace: list[tuple] = []
+  trace_ticks: int = 0
+  """Ticks recorded in `trace`, the first ones of `start()`."""
+
+  _originals: tuple = None
+  _style_depth: int = 0
+  _mark: float = 0.0
+  _tick_counts: tuple = None
+  _tick_phase_sec: list[float] = [0.0, 0.0, 0.0, 0.0]
+
+  @staticmethod
+  def enable(trace_ticks: int = 0) -> None:
+    """Starts counting, and tracing the first `trace_ticks` ticks of each `start()`."""
+    global fill_rect, draw_string, keydown
+    Profile.trace_ticks = trace_ticks
+    Profile.reset()
+    if Profile.enabled:
+      return
+    Profile.enabled = True
+    Profile._originals = (fill_rect, draw_string, keydown, Style.get)
+    original_fill_rect, original_draw_string, original_keydown, original_get = Profile._originals
+
+    def counting_fill_rect(x, y, width, height, color):
+      Profile.fill_rects += 1
+      Profile.pixels += width * height
+      original_fill_rect(x, y, width, height, color)
+
+    def counting_draw_string(txt, x, y, *args):
+      Profile.draw_strings += 1
+      Profile.pixels += len(txt) * 10 * CHAR_HEIGHT
+      original_draw_string(txt, x, y, *args)
+
+    def counting_keydown(key):
+      Profile.keydowns += 1
+      return original_keydown(key)
+
+    def counting_get(style, color_name):
+      Profile.style_gets += 1
+      Profile._style_depth += 1
+      if Profile._style_depth > Profile.max_style_depth:
+        Profile.max_style_depth = Profile._style_depth
+      try:
+        return original_get(style, color_name)
+      finally:
+        Profile._style_depth -= 1
+
+    fill_rect = counting_fill_rect
+    draw_string = counting_draw_string
+    keydown = counting_keydown
+    Style.get = counting_get
+
+  @staticmethod
+  def disable() -> None:
+    """Stops counting and puts the original functions back. Totals stay readable."""
+    global fill_rect, draw_string, keydown
+    if Profile.enabled:
+      Profile.enabled = False
+      fill_rect, draw_string, keydown, Style.get = Profile._originals
+      Profile._originals = None
+
+  @staticmethod
+  def reset() -> None:
+    Profile.ticks = Profile.fill_rects = Profile.draw_strings = Profile.pixels = 0
+    Profile.style_gets = Profile.max_style_depth = Profile.keydowns = Profile.draws = 0
+    Profile.class_draws = {}
+    Profile.phase_sec = [0.0, 0.0, 0.0, 0.0]
+    Profile.trace = []
+
+  @staticmethod
+  def count_draw(canvas_item: "CanvasItem") -> None:
+    name = type(canvas_item).__name__
+    Profile.draws += 1
+    Profile.class_draws[name] = Profile.class_draws.get(name, 0) + 1
+
+  @staticmethod
+  def _counts() -> tuple:
+    return (Profile.fill_rects, Profile.draw_strings, Profile.pixels, Profile.style_gets, Profile.keydowns, Profile.draws)
+
+  @staticmethod
+  def begin_tick(tick_start: float) -> None:
+    Profile._mark = tick_start
+    Profile._tick_phase_sec = [0.0, 0.0, 0.0, 0.0]
+    if len(Profile.trace) < Profile.trace_ticks:
+      Profile._tick_counts = Profile._counts()
+
+  @staticmethod
+  def end_phase(phase: int) -> None:
+    """Adds the time since the previous phase ended, or the tick started, to `phase`."""
+    now = monotonic()
+    Profile.phase_sec[phase] += now - Profile._mark
+    Profile._tick_phase_sec[phase] += now - Profile._mark
+    Profile._mark = now
+
+  @staticmethod
+  def end_tick() -> None:
+    Profile.ticks += 1
+    if len(Profile.trace) < Profile.trace_ticks:
+      counts = Profile._counts()
+      Profile.trace.append(
+        (Profile.ticks,) + tuple(Profile._tick_phase_sec)
+        + tuple(counts[i] - Profile._tick_counts[i] for i in range(len(counts)))
+      )
+
+  @staticmethod
+  def report() -> str:
+    """Returns the totals as a few short lines, fitting the calculator's console."""
+    lines = [
+      "ticks " + str(Profile.ticks),
+      "ms input {0:.1f} callbacks {1:.1f} tasks {2:.1f} draw {3:.1f}".format(*[sec * 1000 for sec in Profile.phase_sec]),
+      "fill_rect " + str(Profile.fill_rects) + " draw_string " + str(Profile.draw_strings),
+      "pixels " + str(Profile.pixels),
+      "Style.get " + str(Profile.style_gets) + " depth " + str(Profile.max_style_depth),
+      "keydown " + str(Profile.keydowns),
+      "draw() " + str(Profile.draws),
+    ]
+    for name in Profile.class_draws:
+      lines.append("  " + name + " " + str(Profile.class_draws[name]))
+    return "\n".join(lines)
+
+
+_tasks: list[list] = []
+"""[generator, time to resume it] of each task started with `spawn()`."""
+_next_task: int = 0
+"""Index in `_tasks` of the task to step first, so that each gets its turn."""
+
+def spawn(task) -> None:
+  """
+  Runs the generator `task` in the background while a form is shown. Each
+  tick, after the callbacks, tasks are stepped in turn with `next()` until
+  the tick has been busy for `Config.TICK_BUDGET_SEC`, or has run
+  `Config.TICK_MAX_TASK_STEPS` steps, so keep steps short: a bare `yield`
+  gives the hand back, `yield seconds` also waits that long. Widgets a task
+  changes are repainted at the end of the same tick. Tasks still running
+  when the form closes are dropped, spawn them again before the next one.
+  """
+  _tasks.append([task, 0.0])
+
+def cancel(task) -> None:
+  """Stops a task started with `spawn()`, if it hasn't finished yet."""
+  for i in range(len(_tasks)):
+    if _tasks[i][0] is task:
+      _tasks.pop(i)
+      return
+
+def run_tasks(deadline: float, max_steps: int) -> bool:
+  """
+  Steps the tasks that are due, in turn, until `monotonic()` reaches
+  `deadline`, a step at least, or `max_steps` steps ran.
+  Returns whether any step ran.
+  """
+  global _next_task
+  ran = False
+  skipped = 0
+  while _tasks and skipped < len(_tasks) and max_steps > 0:
+    if _next_task >= len(_tasks):
+      _next_task = 0
+    task = _tasks[_next_task]
+    now = monotonic()
+    if ran and now >= deadline:
+      break
+    if task[1] > now:
+      _next_task += 1
+      skipped += 1
+      continue
+    ran = True
+    skipped = 0
+    max_steps -= 1
+    try:
+      delay = next(task[0])
+    except StopIteration:
+      _tasks.pop(_next_task)
+      continue
+    task[1] = now + delay if delay else 0.0
+    _next_task += 1
+  return ran
+
+
+class Page:
+  """
+  A layout shown with `show_page()`. While hidden, a page keeps its
+  positions, cached sizes, navigation, widget states and hovered item, so
+  showing it again only repaints it.
+  """
+  __slots__ = ("layout", "hovered", "focused", "_saved", "_initial_results")
+  
+  def __init__(self, layout: list[list[CanvasItem]]) -> None:
+    self.layout = layout
+    self.hovered: CanvasItem = None
+    self.focused: bool = False
+    self._saved: tuple = None
+    """Layout engine and navigation state, None until the page is first shown."""
+    self._initial_results: list[tuple] = []
+    """(item, result) of the items having a result when the page was first shown."""
+  
+  def results(self) -> list[list]:
+    """Like `parse_result()`, for this page."""
+    return _parse_rows(self.layout)
+
+
+_current_page: Page = None
+_next_page: Page = None
+
+def show_page(page: Page) -> None:
+  """Shows `page` from the next tick of `start()`, or as the first page of the next `start()`."""
+  global _next_page
+  _next_page = page
+
+def _leave_page(page: Page, hovering_canvas_item: CanvasItem, focused: bool) -> None:
+  """Saves the state of `page`, and unlinks its items from their rows, so changing them while hidden repaints nothing."""
+  page.hovered = hovering_canvas_item
+  page.focused = focused
+  page._saved = (_layout_top, _scroll_row, _window_start, _window_end, _row_widths, _nav_items, _nav_neighbors, _nav_valid)
+  for y in placed_rows():
+    row = page.layout[y]
+    _results.pop(id(row), None)
+    for canvas_item in row:
+      canvas_item._row = None
 
+def _reset_states() -> None:
+  """Unhovers every item of `layout` and enables the first button of each row only."""
+  if isinstance(layout, LazyRows):
+    return
   for row in layout:
     for canvas_item in row:
       if isinstance(canvas_item, Button):
         canvas_item.enabled = False
       canvas_item.hovered = False
     row[0].enabled = True
-  layout_get((0, 0)).hovered = True
 
-  y: int = 111 - canvas_items_height(layout)//2
-  for row in layout:
-    x: int = 160 - canvas_items_width(row)//2
-    for canvas_item in row:
-      canvas_item.position = Vector2(x, y)
-      canvas_item.draw()
-      x += canvas_items_width([canvas_item])  + SPACEMENT_X
+def _enter_page(page: Page, reset_states: bool = False) -> CanvasItem:
+  """
+  Makes `page` the current one, laying it out only the first time, and
+  returns the item to hover. With `reset_states`, a page shown before gets
+  its states reset like the first time, and its values back to the ones it
+  was first shown with.
+  """
+  global layout, _current_page, _layout_top, _scroll_row, _window_start, _window_end, _row_widths, _nav_items, _nav_neighbors, _nav_valid
+  _current_page = page
+  layout = page.layout
+  _damage.clear()
+  damage((0, 0, 320, 222))
+  
+  if page._saved is None:
+    _reset_states()
+    if not isinstance(layout, LazyRows):
+      page._initial_results = [(canvas_item, canvas_item.result()) for row in layout for canvas_item in row if canvas_item.result() is not None]
+    _scroll_row = 0
+    layout_all()
+    build_navigation()
+    return first_navigable()
+  
+  _layout_top, _scroll_row, _window_start, _window_end, _row_widths, _nav_items, _nav_neighbors, _nav_valid = page._saved
+  page._saved = None
+  if reset_states:
+    _reset_states()
+    for canvas_item, value in page._initial_results:
+      canvas_item.reset_result(value)
+  # Only rows whose items changed size while hidden are laid out again.
+  for y in placed_rows():
+    row = layout[y]
+    if _row_widths.get(y) != canvas_items_width(row):
+      place_row(y)
+    else:
+      for canvas_item in row:
+        canvas_item._row = row
+      _track_results(row)
+  if page.hovered is None or page.hovered._row is None:
+    return first_navigable()
+  return page.hovered
 
-    y += canvas_items_height(1) + SPACEMENT_Y
 
+class Form(Page):
+  """
+  A page shown on its own with `start()` or `run()`, as many times as
+  needed. Showing it again is a warm restart: the positions and navigation
+  computed the last time are kept, as well as, by default, the values of
+  its widgets and the hovered item. Forms can be kept side by side and
+  shown in any order, but one at a time: a shown form sets the module's
+  `layout`, base style and input state, so two forms can't be driven
+  together, like with two `gui_async.start(form=...)` at once.
+  """
+  __slots__ = ("style",)
+  
+  def __init__(self, layout: list[list[CanvasItem]], style: Style = None) -> None:
+    super().__init__(layout)
+    self.style: Style = style
+    """Base style while the form is shown, the current one if None."""
+  
+  def start(self, on_change = None, keep_values: bool = True, keep_hover: bool = True) -> list[list]:
+    """Like the `start()` function, for this form."""
+    return _drive(self.run(keep_values, keep_hover), on_change)
+  
+  def run(self, keep_values: bool = True, keep_hover: bool = True):
+    """Like the `run()` function, for this form."""
+    return (yield from _sleeping(self.steps(keep_values, keep_hover)))
+  
+  def steps(self, keep_values: bool = True, keep_hover: bool = True):
+    """Like the `steps()` function, for this form."""
+    previous_style = _BASE_STYLE
+    if self.style:
+      set_base_style(self.style)
+    try:
+      return (yield from steps(self, True, keep_values, keep_hover))
+    finally:
+      set_base_style(previous_style)
 
-  hovering_pos = Vector2(0, 0)
-  hovering_canvas_item = layout_get(hovering_pos)
-  focused: bool = False
 
-  while not keydown(KEY_OK):
-    sleep(1/TPS)
-    
-    old_hovering_pos = None
+def start(on_change = None) -> list[list]:
+  """
+  Shows the form in `layout` until OK is pressed, and returns `parse_result()`.
+  `on_change(row, column, value)` is called each time a result changes.
+  """
+  return _drive(run(), on_change)
+
+def _drive(changes, on_change) -> list[list]:
+  while True:
+    try:
+      change = next(changes)
+    except StopIteration as stop:
+      return stop.value
+    if on_change:
+      on_change(*change)
+
+def run(page: Page = None, warm: bool = False, keep_values: bool = True, keep_hover: bool = True):
+  """
+  Generator version of `start()`: yields (row, column, value) each time a
+  result changes, before the frame showing it is painted, and returns
+  `parse_result()` when OK is pressed.
+  `page` defaults to the one passed to `show_page()`, else to one showing
+  `layout`. It starts afresh unless `warm`, in which case a page shown
+  before keeps its positions and navigation, its widgets' states and values
+  unless not `keep_values` (Sliders and TextBoxes then get back the values
+  the page was first shown with), and its hovered item unless not `keep_hover`.
+  """
+  return (yield from _sleeping(steps(page, warm, keep_values, keep_hover)))
+
+def _sleeping(steps):
+  """Sleeps for the seconds `steps` yields, and yields its changes."""
+  while True:
+    try:
+      step = next(steps)
+    except StopIteration as stop:
+      return stop.value
+    if isinstance(step, tuple):
+      yield step
+    else:
+      sleep(step)
+
+def steps(page: Page = None, warm: bool = False, keep_values: bool = True, keep_hover: bool = True):
+  """
+  Like `run()`, but yields the seconds to sleep between ticks instead of
+  sleeping, so that another event loop can wait for them, see gui_async.py.
+  Changes are yielded as tuples, seconds as any other number.
+  """
+  global _results, _next_page
+  _results = {}
+  _result_changes.clear()
+  if Profile.enabled:
+    Profile.reset()
+  if page is None:
+    page = _next_page
+  _next_page = None
+  if page is None:
+    page = _current_page if _current_page and _current_page.layout is layout else Page(layout)
+  if _current_page is not None and _current_page is not page:
+    # The page shown last keeps its state, in case it is shown again warm.
+    _leave_page(_current_page, _current_page.hovered, _current_page.focused)
+  elif warm and page is _current_page:
+    # Still laid out: save its state to restore it like a hidden page's.
+    _leave_page(page, page.hovered, page.focused)
+  if not warm:
+    # The first page starts afresh, the next ones shown keep their state.
+    page._saved = None
+  hovering_canvas_item = _enter_page(page, not keep_values)
+  if not keep_hover and hovering_canvas_item is page.hovered:
+    hovering_canvas_item.hovered = False
+    hovering_canvas_item = first_navigable()
+  hovering_canvas_item.hovered = True
+  hovering_canvas_item.focused = False
+  focused: bool = False
+  
+  flush_damage()
+
+  TickTiming.reset()
+  last_active_time: float = monotonic()
+  seen_layout_version: int = layout_version
+
+  while True:
+    tick_start: float = monotonic()
+    tick_alloc: int = mem_alloc() if mem_alloc else 0
+    if Profile.enabled:
+      Profile.begin_tick(tick_start)
+    active: bool = scan_keys(hovering_canvas_item.INPUT_KEYS if focused else NAVIGATION_KEYS)
+    if key_pressed(KEY_OK):
+      break
     
     if focused:
       hovering_canvas_item.handle_input()
     else:
-      for key in MOVES:
-        if keydown(key):
-          if not old_hovering_pos:
-            old_hovering_pos = hovering_pos
-          hovering_pos = layout_clamp(hovering_pos + MOVES[key])
-          hovering_canvas_item = layout_get(hovering_pos)
-
-      if old_hovering_pos and old_hovering_pos != hovering_pos:
-        button = layout_get(old_hovering_pos)
-        button.hovered = False
-        button.draw()
+      old_hovering_canvas_item = hovering_canvas_item
+      for direction in range(len(MOVE_KEYS)):
+        if key_pressed(MOVE_KEYS[direction]):
+          hovering_canvas_item = navigate(hovering_canvas_item, direction)
+
+      if old_hovering_canvas_item is not hovering_canvas_item:
+        old_hovering_canvas_item.hovered = False
+        old_hovering_canvas_item.mark_dirty()
 
         hovering_canvas_item.hovered = True
-        hovering_canvas_item.draw()
+        hovering_canvas_item.mark_dirty()
+        scroll_to(row_at(hovering_canvas_item.position.y))
 
-    if keydown(KEY_EXE):
+    if key_pressed(KEY_EXE):
       if isinstance(hovering_canvas_item, Focusable):
         focused = not focused
         hovering_canvas_item.focused = focused
-        hovering_canvas_item.draw()
+        hovering_canvas_item.mark_dirty()
       else:
-        for i, canvas_item in enumerate(layout[hovering_pos.y]):
+        for canvas_item in hovering_canvas_item._row:
           if isinstance(canvas_item, Button):
-            if i == hovering_pos.x:
+            if canvas_item is hovering_canvas_item:
               if not canvas_item.enabled:
                 canvas_item.enabled = True
-                canvas_item.draw()
+                canvas_item.mark_dirty()
             elif canvas_item.enabled:
               canvas_item.enabled = False
-              canvas_item.draw()
-      wait_released(KEY_EXE)
-      
-
-    if EMULATED:
-      try:
-        display(True) # type: ignore
-      except:
-        pass
-
-    while old_hovering_pos:
-      old_hovering_pos = False
-      for key in MOVES:
-        if keydown(key):
-          old_hovering_pos = True
-
-  wait_released(KEY_OK)
+              canvas_item.mark_dirty()
+    
+    if Profile.enabled:
+      Profile.end_phase(Profile.INPUT)
+    flush_changes()
+    while _result_changes:
+      yield _result_changes.pop(0)
+    
+    if _next_page is not None:
+      _leave_page(_current_page, hovering_canvas_item, focused)
+      hovering_canvas_item = _enter_page(_next_page)
+      _next_page = None
+      focused = _current_page.focused and hovering_canvas_item is _current_page.hovered
+      hovering_canvas_item.hovered = True
+      seen_layout_version = layout_version
+    
+    if seen_layout_version != layout_version:
+      # Callbacks added or removed items: keep hovering something that still exists.
+      seen_layout_version = layout_version
+      if hovering_canvas_item._row is None:
+        build_navigation()
+        focused = False
+        hovering_canvas_item.hovered = hovering_canvas_item.focused = False
+        hovering_canvas_item = _nav_items[min(hovering_canvas_item._nav_index, len(_nav_items) - 1)]
+        hovering_canvas_item.hovered = True
+        hovering_canvas_item.mark_dirty()
+    
+    if Profile.enabled:
+      Profile.end_phase(Profile.CALLBACKS)
+    if _tasks and run_tasks(tick_start + Config.TICK_BUDGET_SEC, Config.TICK_MAX_TASK_STEPS):
+      active = True
+    if Profile.enabled:
+      Profile.end_phase(Profile.TASKS)
+    if flush_damage():
+      active = True
+      if EMULATED:
+        try:
+          display(True) # type: ignore
+        except:
+          pass
+    if Profile.enabled:
+      Profile.end_phase(Profile.DRAW)
+      Profile.end_tick()
+    
+    # Run at full rate right after activity, then poll slower, minus the time already spent.
+    if active:
+      last_active_time = tick_start
+    idle: bool = tick_start - last_active_time >= Config.IDLE_DELAY_SEC
+    busy_sec: float = monotonic() - tick_start
+    TickTiming.record(busy_sec, idle, mem_alloc() - tick_alloc if mem_alloc else 0)
+    period: float = 1 / (Config.IDLE_TPS if idle else TPS)
+    if busy_sec < period:
+      yield period - busy_sec
+
+  _tasks.clear()
+  flush_changes()
+  while _result_changes:
+    yield _result_changes.pop(0)
+  _current_page.hovered = hovering_canvas_item
+  _current_page.focused = focused
+  flush_damage()
+  while keydown(KEY_OK):
+    yield Config.DELAY_SEC_BETWEEN_RELEASE_CHECKS
 
   return parse_result()
 
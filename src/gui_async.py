@@ -0,0 +1,23 @@
+"""
+Shows gui.py forms from an asyncio event loop, on a computer: the other
+asyncio tasks run while the form waits between ticks. It is not meant to be
+sent to the calculator, where background work is started with `gui.spawn()`.
+
+  asyncio.run(gui_async.start(on_change))
+"""
+import asyncio
+import gui
+
+
+async def start(on_change = None, form: "gui.Form" = None, keep_values: bool = True, keep_hover: bool = True) -> list[list]:
+  """Like `gui.start()`, or `form.start()` with a `form`, awaiting `asyncio.sleep()` between ticks."""
+  steps = form.steps(keep_values, keep_hover) if form else gui.steps()
+  while True:
+    try:
+      step = next(steps)
+    except StopIteration as stop:
+      return stop.value
+    if not isinstance(step, tuple):
+      await asyncio.sleep(step)
+    elif on_change:
+      on_change(*step)
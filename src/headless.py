@@ -0,0 +1,333 @@
+"""
+Pure Python stand-in for Numworks' `kandinsky` and `ion` modules, drawing
+into an in-memory framebuffer. Used to measure and test rendering on a
+computer, it is not meant to be sent to the calculator.
+
+Select it with the `GUI_BACKEND=headless` environment variable, or call
+`install()` before importing a script that uses `kandinsky` or `ion`.
+"""
+
+import sys
+
+WIDTH = 320
+HEIGHT = 222
+CHAR_WIDTH = 10
+CHAR_HEIGHT = 18
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+
+KEY_LEFT = 0
+KEY_UP = 1
+KEY_DOWN = 2
+KEY_RIGHT = 3
+KEY_OK = 4
+KEY_BACK = 5
+KEY_HOME = 6
+KEY_ONOFF = 7
+KEY_SHIFT = 12
+KEY_ALPHA = 13
+KEY_XNT = 14
+KEY_VAR = 15
+KEY_TOOLBOX = 16
+KEY_BACKSPACE = 17
+KEY_EXP = 18
+KEY_LN = 19
+KEY_LOG = 20
+KEY_IMAGINARY = 21
+KEY_COMMA = 22
+KEY_POWER = 23
+KEY_SINE = 24
+KEY_COSINE = 25
+KEY_TANGENT = 26
+KEY_PI = 27
+KEY_SQRT = 28
+KEY_SQUARE = 29
+KEY_SEVEN = 30
+KEY_EIGHT = 31
+KEY_NINE = 32
+KEY_LEFTPARENTHESIS = 33
+KEY_RIGHTPARENTHESIS = 34
+KEY_FOUR = 36
+KEY_FIVE = 37
+KEY_SIX = 38
+KEY_MULTIPLICATION = 39
+KEY_DIVISION = 40
+KEY_ONE = 42
+KEY_TWO = 43
+KEY_THREE = 44
+KEY_PLUS = 45
+KEY_MINUS = 46
+KEY_ZERO = 48
+KEY_DOT = 49
+KEY_EE = 50
+KEY_ANS = 51
+KEY_EXE = 52
+
+__all__ = [
+  "color", "fill_rect", "set_pixel", "get_pixel", "draw_string", "display",
+  "keydown",
+  "KEY_LEFT", "KEY_UP", "KEY_DOWN", "KEY_RIGHT", "KEY_OK", "KEY_BACK",
+  "KEY_HOME", "KEY_ONOFF", "KEY_SHIFT", "KEY_ALPHA", "KEY_XNT", "KEY_VAR",
+  "KEY_TOOLBOX", "KEY_BACKSPACE", "KEY_EXP", "KEY_LN", "KEY_LOG",
+  "KEY_IMAGINARY", "KEY_COMMA", "KEY_POWER", "KEY_SINE", "KEY_COSINE",
+  "KEY_TANGENT", "KEY_PI", "KEY_SQRT", "KEY_SQUARE", "KEY_SEVEN",
+  "KEY_EIGHT", "KEY_NINE", "KEY_LEFTPARENTHESIS", "KEY_RIGHTPARENTHESIS",
+  "KEY_FOUR", "KEY_FIVE", "KEY_SIX", "KEY_MULTIPLICATION", "KEY_DIVISION",
+  "KEY_ONE", "KEY_TWO", "KEY_THREE", "KEY_PLUS", "KEY_MINUS", "KEY_ZERO",
+  "KEY_DOT", "KEY_EE", "KEY_ANS", "KEY_EXE",
+]
+"""Only the names the real modules provide are exported by `import *`."""
+
+_buffer = bytearray(bytes(WHITE) * (WIDTH * HEIGHT))
+"""The screen, 3 bytes (red, green, blue) per pixel, row by row."""
+
+counters: dict[str, list[int]] = {}
+"""Function name -> [calls, pixels written]."""
+
+_held: set[int] = set()
+_taps: dict[int, int] = {}
+
+
+def reset_counters() -> None:
+  counters.clear()
+
+def _count(name: str, pixels: int) -> None:
+  counter = counters.get(name)
+  if counter is None:
+    counters[name] = [1, pixels]
+  else:
+    counter[0] += 1
+    counter[1] += pixels
+
+def pixels_written() -> int:
+  return sum(counter[1] for counter in counters.values())
+
+
+def color(r, g = None, b = None) -> tuple[int, int, int]:
+  """Converts anything kandinsky accepts as a color into an (r, g, b) tuple."""
+  if g is not None:
+    return (int(r) & 255, int(g) & 255, int(b) & 255)
+  if isinstance(r, str):
+    if r.startswith("#") and len(r) == 7:
+      return (int(r[1:3], 16), int(r[3:5], 16), int(r[5:7], 16))
+    raise ValueError("headless: unsupported color: " + r)
+  if isinstance(r, int):
+    return ((r >> 16) & 255, (r >> 8) & 255, r & 255)
+  return (int(r[0]) & 255, int(r[1]) & 255, int(r[2]) & 255)
+
+def _clip(x: int, y: int, width: int, height: int) -> tuple[int, int, int, int]:
+  if width < 0:
+    x += width
+    width = -width
+  if height < 0:
+    y += height
+    height = -height
+  left = max(0, x)
+  top = max(0, y)
+  right = min(WIDTH, x + width)
+  bottom = min(HEIGHT, y + height)
+  return (left, top, max(0, right - left), max(0, bottom - top))
+
+def _fill(x: int, y: int, width: int, height: int, rgb: bytes) -> int:
+  x, y, width, height = _clip(x, y, width, height)
+  if not width or not height:
+    return 0
+  row = rgb * width
+  for line in range(y, y + height):
+    start = (line * WIDTH + x) * 3
+    _buffer[start:start + width * 3] = row
+  return width * height
+
+
+def fill_rect(x: int, y: int, width: int, height: int, fill_color) -> None:
+  _count("fill_rect", _fill(x, y, width, height, bytes(color(fill_color))))
+
+def set_pixel(x: int, y: int, pixel_color) -> None:
+  _count("set_pixel", _fill(x, y, 1, 1, bytes(color(pixel_color))))
+
+def get_pixel(x: int, y: int) -> tuple[int, int, int]:
+  if not (0 <= x < WIDTH and 0 <= y < HEIGHT):
+    return BLACK
+  start = (y * WIDTH + x) * 3
+  return (_buffer[start], _buffer[start + 1], _buffer[start + 2])
+
+def draw_string(txt: str, x: int, y: int, text_color = BLACK, background = WHITE) -> None:
+  """
+  Draws each character as a cell filled with `background` and a pattern
+  derived from its code point. Glyphs don't look like the real font, but
+  identical strings always produce identical pixels.
+  """
+  txt_rgb = bytes(color(text_color))
+  background_rgb = bytes(color(background))
+  pixels = 0
+  for i, char in enumerate(txt):
+    cell_x = x + i * CHAR_WIDTH
+    pixels += _fill(cell_x, y, CHAR_WIDTH, CHAR_HEIGHT, background_rgb)
+    if char == " ":
+      continue
+    pattern = (ord(char) * 2654435761) & 0xFFFFFFFF
+    for bit in range(32):
+      if pattern >> bit & 1:
+        _fill(cell_x + 1 + (bit % 4) * 2, y + 1 + (bit // 4) * 2, 2, 2, txt_rgb)
+  _count("draw_string", pixels)
+
+def display(*args) -> None:
+  """Kept for compatibility with desktop emulators, the buffer is always up to date."""
+  _count("display", 0)
+
+
+def keydown(key: int) -> bool:
+  _count("keydown", 0)
+  if key in _taps:
+    _taps[key] -= 1
+    if _taps[key] <= 0:
+      del _taps[key]
+    return True
+  return key in _held
+
+def press(*keys: int) -> None:
+  """Holds `keys` down until they are released."""
+  _held.update(keys)
+
+def release(*keys: int) -> None:
+  """Releases `keys`, or every key if none is given."""
+  if keys:
+    _held.difference_update(keys)
+  else:
+    _held.clear()
+    _taps.clear()
+
+def tap(key: int, polls: int = 1) -> None:
+  """Makes `key` read as pressed for its next `polls` reads only."""
+  _taps[key] = _taps.get(key, 0) + polls
+
+
+def clear(fill_color = WHITE) -> None:
+  _buffer[:] = bytes(color(fill_color)) * (WIDTH * HEIGHT)
+
+def dump() -> bytes:
+  """Returns a copy of the framebuffer, see `diff()` and `save_ppm()`."""
+  return bytes(_buffer)
+
+def diff(a: bytes, b: bytes) -> int:
+  """Returns how many pixels differ between two dumps."""
+  return sum(1 for i in range(0, len(a), 3) if a[i:i + 3] != b[i:i + 3])
+
+def save_ppm(path: str, frame: bytes = None) -> None:
+  with open(path, "wb") as file:
+    file.write(b"P6 " + str(WIDTH).encode() + b" " + str(HEIGHT).encode() + b" 255\n")
+    file.write(_buffer if frame is None else frame)
+
+
+class Replay:
+  """
+  Drives a gui module from (tick, key, held) events, like the ones
+  `gui.record_input()` records, on a virtual clock: `sleep()` ends a tick
+  and returns at once, so a session replays as fast as the CPU allows.
+  
+  Events may also be (tick, key, held, seconds): they are then applied once
+  the virtual clock reaches their seconds instead of their tick, so keys
+  are held as long as they were when recorded, and repeat as often.
+  
+  Keys still held after the last event are released at the next tick, as
+  recordings stop at the OK press that closes the form. Loops polling keys
+  without sleeping end a tick every `max_polls_per_tick` polls.
+  
+  Measures the latency of each key press: ticks and `keydown()` polls
+  until the next draw call, None if nothing was drawn before the next press.
+  """
+  
+  def __init__(self, module, events: list[tuple], poll_sec: float = 0.0, max_idle_ticks: int = 10000, max_polls_per_tick: int = 1000) -> None:
+    self.module = module
+    self.timed: bool = bool(events) and len(events[0]) > 3
+    """Whether events are applied on their seconds rather than their tick."""
+    self.events: list[tuple] = sorted(events, key = lambda event: event[3 if self.timed else 0])
+    self.poll_sec: float = poll_sec
+    """Virtual time spent by each `keydown()` call."""
+    self.max_idle_ticks: int = max_idle_ticks
+    """Ticks the form may stay open after the last event."""
+    self.max_polls_per_tick: int = max_polls_per_tick
+    self.tick: int = 0
+    self.clock: float = 0.0
+    self.polls: int = 0
+    self.latencies: list[tuple[int, int, int, int]] = []
+    """(tick, key, ticks, polls) of each press, ticks and polls being None if it drew nothing."""
+    self._next_event: int = 0
+    self._last_event_tick: int = 0
+    self._pending: tuple[int, int, int] = None
+    self._draws: int = 0
+    self._tick_polls: int = 0
+    
+    module.keydown = self.keydown
+    module.sleep = self.sleep
+    if hasattr(module, "monotonic"):
+      module.monotonic = self.monotonic
+  
+  def keydown(self, key: int) -> bool:
+    self.polls += 1
+    self.clock += self.poll_sec
+    self._tick_polls += 1
+    if self._tick_polls > self.max_polls_per_tick:
+      self.sleep(0)
+    return keydown(key)
+  
+  def sleep(self, seconds: float) -> None:
+    self._check_draws()
+    self.clock += seconds
+    self.tick += 1
+    self._tick_polls = 0
+    if self._next_event == len(self.events) and self.tick > self._last_event_tick + self.max_idle_ticks:
+      raise RuntimeError("headless: the replay ended but the form is still open")
+    self._apply_events()
+  
+  def monotonic(self) -> float:
+    return self.clock
+  
+  def run(self):
+    """Replays the events through `module.start()`, and returns its result."""
+    release()
+    reset_counters()
+    self._apply_events()
+    result = self.module.start()
+    self._finish_pending()
+    return result
+  
+  def _due(self, event: tuple) -> bool:
+    return event[3] <= self.clock if self.timed else event[0] <= self.tick
+  
+  def _apply_events(self) -> None:
+    if self._next_event == len(self.events) and self.events and self.tick > self._last_event_tick:
+      release()
+    while self._next_event < len(self.events) and self._due(self.events[self._next_event]):
+      key, held = self.events[self._next_event][1:3]
+      self._next_event += 1
+      self._last_event_tick = self.tick
+      if held:
+        press(key)
+        self._finish_pending()
+        self._pending = (self.tick, key, self.polls)
+      else:
+        release(key)
+  
+  def _draw_calls(self) -> int:
+    return sum(counters[name][0] for name in ("fill_rect", "draw_string", "set_pixel") if name in counters)
+  
+  def _check_draws(self) -> None:
+    draws = self._draw_calls()
+    if draws != self._draws:
+      self._draws = draws
+      if self._pending:
+        tick, key, polls = self._pending
+        self.latencies.append((tick, key, self.tick - tick, self.polls - polls))
+        self._pending = None
+  
+  def _finish_pending(self) -> None:
+    if self._pending:
+      self.latencies.append((self._pending[0], self._pending[1], None, None))
+      self._pending = None
+
+
+def install() -> None:
+  """Registers this module as `kandinsky` and `ion` for later imports."""
+  sys.modules["kandinsky"] = sys.modules[__name__]
+  sys.modules["ion"] = sys.modules[__name__]
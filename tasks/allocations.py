@@ -0,0 +1,81 @@
+import sys, tracemalloc
+
+sys.path.insert(0, "tasks")
+from benchmark import load, Run, scenarios, headless
+
+
+MEASURE_BYTES: int = 96
+"""Allocated at each tick by the measurement itself and the replay's counters."""
+WIDGETS: int = 100
+"""Widgets built per class to average their size."""
+
+
+class AllocationRun(Run):
+	"""
+	A benchmark run measuring, for each tick, the peak memory allocated above
+	what was in use when the tick started. Key reads don't allocate, and what
+	the replay allocates between ticks isn't measured.
+	"""
+
+	def __init__(self, module, timeline) -> None:
+		super().__init__(module, timeline)
+		self.tick_peaks: list[int] = []
+		self.tick_start: int = 0
+
+	def sleep(self, seconds: float) -> None:
+		current, peak = tracemalloc.get_traced_memory()
+		if self.tick:
+			self.tick_peaks.append(peak - self.tick_start)
+		super().sleep(seconds)
+		tracemalloc.reset_peak()
+		self.tick_start = tracemalloc.get_traced_memory()[0] + MEASURE_BYTES
+
+
+def widget_bytes(module) -> dict[str, int]:
+	"""Returns the bytes retained by one instance of each widget class."""
+	builders = {
+		"Vector2": lambda: module.Vector2(1, 2),
+		"Label": lambda: module.Label("label"),
+		"Button": lambda: module.Button("button"),
+		"TextBox": lambda: module.TextBox(),
+		"Slider": lambda: module.Slider(0, 100, 1),
+	}
+	result: dict[str, int] = {}
+	for name, build in builders.items():
+		widgets = [None] * WIDGETS
+		before = tracemalloc.get_traced_memory()[0]
+		for i in range(WIDGETS):
+			widgets[i] = build()
+		result[name] = (tracemalloc.get_traced_memory()[0] - before) // WIDGETS
+	return result
+
+
+def main() -> None:
+	tracemalloc.start()
+	module = load("gui_src", "src/gui.py")
+	print("Bytes per widget (CPython, with the callback and style of a default widget):")
+	for name, size in widget_bytes(module).items():
+		print("  " + name.ljust(10) + str(size).rjust(6))
+
+	print()
+	print("scenario".ljust(24) + "ticks".rjust(7) + "allocating".rjust(12) + "max bytes".rjust(12) + "mean bytes".rjust(12))
+	for name, build, timeline in scenarios():
+		if not timeline:
+			continue
+		module = load("gui_src", "src/gui.py")
+		module.layout = build(module)
+		run = AllocationRun(module, timeline)
+		headless.clear()
+		run.run()
+		# Skip the first paint, it builds the layout and navigation.
+		peaks = [max(0, peak) for peak in run.tick_peaks[1:]]
+		allocating = [peak for peak in peaks if peak > 0]
+		print(
+			name.ljust(24) + str(len(peaks)).rjust(7) + str(len(allocating)).rjust(12)
+			+ str(max(peaks, default=0)).rjust(12)
+			+ str(sum(peaks) // max(1, len(peaks))).rjust(12)
+		)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,191 @@
+import sys, time, importlib.util
+
+sys.path.insert(0, "src")
+import headless
+headless.install()
+from headless import *
+
+
+MODULES: dict[str, str] = {
+	"src": "src/gui.py",
+	"minified": "minified/gui.py",
+}
+SIZES: list[tuple[int, int, int]] = [
+	# rows, widgets per row, text length
+	(2, 2, 2),
+	(4, 3, 4),
+	(8, 4, 6),
+	(16, 6, 8),
+]
+POLL_SEC: float = 0.00002
+"""Virtual time spent by each keydown() call."""
+TAP_TICKS: int = 6
+"""Ticks a tapped key is held then released, long enough for a release check."""
+
+
+def load(name: str, path: str):
+	spec = importlib.util.spec_from_file_location(name, path)
+	module = importlib.util.module_from_spec(spec)
+	spec.loader.exec_module(module)
+	return module
+
+
+class Run(headless.Replay):
+	"""
+	Replays a timeline of held keys on the virtual clock of `headless.Replay`,
+	so runs don't depend on wall-clock time, and measures what it draws.
+	"""
+
+	def __init__(self, module, timeline: list[tuple[int, set[int]]]) -> None:
+		self.tick_sec: float = 1 / module.TPS
+		self.ticks: int = 0
+		self.style_gets: int = 0
+		self.first_paint: dict[str, int] = None
+
+		events: list[tuple[int, int, bool, float]] = []
+		tick: int = 0
+		held: set[int] = set()
+		for ticks, keys in [(TAP_TICKS, set())] + timeline + [(TAP_TICKS, {KEY_OK}), (TAP_TICKS, set())]:
+			start = tick * self.tick_sec
+			events += [(tick, key, False, start) for key in sorted(held - keys)]
+			events += [(tick, key, True, start) for key in sorted(keys - held)]
+			tick += ticks
+			held = keys
+		super().__init__(module, events, POLL_SEC, max_idle_ticks = module.TPS)
+
+		original_get = module.Style.get
+		def counting_get(style, color_name):
+			self.style_gets += 1
+			return original_get(style, color_name)
+		module.Style.get = counting_get
+
+	def sleep(self, seconds: float) -> None:
+		if self.first_paint is None:
+			self.first_paint = self.snapshot()
+		if seconds == self.tick_sec:
+			self.ticks += 1
+		super().sleep(seconds)
+
+	def snapshot(self) -> dict[str, int]:
+		return {
+			"draw calls": sum(headless.counters.get(name, (0, 0))[0] for name in ("fill_rect", "draw_string", "set_pixel")),
+			"pixels": headless.pixels_written(),
+			"Style.get": self.style_gets,
+			"keydown": headless.counters.get("keydown", (0, 0))[0],
+		}
+
+	def execute(self) -> tuple[dict[str, int], dict[str, int], float]:
+		"""Returns the first paint's counts, then the following ticks' counts and wall time per tick."""
+		headless.clear()
+		wall_time = time.perf_counter()
+		self.run()
+		wall_time = time.perf_counter() - wall_time
+
+		if hasattr(self.module, "TickTiming"):
+			# Ticks sleep for what remains of their period.
+			self.ticks = self.module.TickTiming.ticks
+		total = self.snapshot()
+		first_paint = self.first_paint or total
+		ticks = {name: total[name] - first_paint[name] for name in total}
+		return first_paint, ticks, wall_time / max(1, self.ticks)
+
+
+def redraw_label(module, label) -> None:
+	"""Versions with a layout engine redraw a label when its text is set."""
+	if not hasattr(module, "layout_row_changed"):
+		label.draw()
+
+def generated_layout(module, rows: int, per_row: int, text_length: int) -> list[list]:
+	slider = module.Slider(0, 100, 1)
+	label = module.Label("50")
+	def slider_callback():
+		label.txt = "{0:2d}".format(slider.value)
+		redraw_label(module, label)
+	slider.callback = slider_callback
+
+	layout = [
+		[slider, label],
+		[module.Label("Text:"), module.TextBox()],
+	]
+	for row in range(rows):
+		layout.append([module.Button(chr(ord("a") + (row + i) % 26) * text_length) for i in range(per_row)])
+	return layout
+
+def example_layout(module) -> list[list]:
+	"""Same layout as `example()` in src/gui.py."""
+	slider = module.Slider(0, 91, 1)
+	label = module.Label("XX")
+	def slider_callback():
+		label.txt = "{0:2d}".format(slider.value)
+		redraw_label(module, label)
+	slider.callback = slider_callback
+	slider_callback()
+
+	return [
+		[module.Button("I"), module.Button("am"), module.Button("button")],
+		[slider, label],
+		[module.Label("Type some text:"), module.TextBox()],
+	]
+
+
+def taps(*keys: int) -> list[tuple[int, set[int]]]:
+	timeline: list[tuple[int, set[int]]] = []
+	for key in keys:
+		timeline += [(TAP_TICKS, {key}), (TAP_TICKS, set())]
+	return timeline
+
+def hover_timeline(rows: int, per_row: int) -> list[tuple[int, set[int]]]:
+	return taps(*([KEY_DOWN] * (rows + 1) + [KEY_RIGHT] * per_row + [KEY_UP] * (rows + 1) + [KEY_LEFT] * per_row))
+
+def typing_timeline(text_box_row: int, text_length: int) -> list[tuple[int, set[int]]]:
+	letters = [KEY_EXP + i % 17 for i in range(text_length)]
+	return taps(*[KEY_DOWN] * text_box_row, KEY_RIGHT, KEY_EXE, *letters, KEY_LEFT, KEY_BACKSPACE, KEY_EXE)
+
+def slider_timeline() -> list[tuple[int, set[int]]]:
+	return taps(KEY_EXE) + [(150, {KEY_RIGHT}), (TAP_TICKS, set()), (60, {KEY_SHIFT, KEY_LEFT})] + taps(KEY_EXE)
+
+
+def scenarios() -> list[tuple[str, object, list[tuple[int, set[int]]]]]:
+	"""Returns (name, layout builder, timeline) triplets."""
+	result = [
+		("example first paint", example_layout, []),
+		("example idle 3s", example_layout, [(300, set())]),
+		("example hover", example_layout, hover_timeline(2, 2)),
+		("example typing", example_layout, typing_timeline(2, 20)),
+		("example slider", lambda module: [example_layout(module)[1]], slider_timeline()),
+	]
+	for rows, per_row, text_length in SIZES:
+		size = str(rows) + "x" + str(per_row) + "x" + str(text_length)
+		def build(module, rows=rows, per_row=per_row, text_length=text_length):
+			return generated_layout(module, rows, per_row, text_length)
+		result += [
+			(size + " first paint", build, []),
+			(size + " hover", build, hover_timeline(rows, per_row)),
+			(size + " typing", build, typing_timeline(1, text_length * 4)),
+			(size + " slider", build, slider_timeline()),
+		]
+	return result
+
+
+def main() -> None:
+	columns = ["draw calls", "pixels", "Style.get", "keydown"]
+	print(
+		"scenario".ljust(24) + "module".ljust(10) + "ticks".rjust(7)
+		+ "".join(column.rjust(12) for column in columns) + "ms/tick".rjust(10)
+	)
+	for name, build, timeline in scenarios():
+		for module_name, path in MODULES.items():
+			module = load("gui_" + module_name, path)
+			module.layout = build(module)
+			run = Run(module, timeline)
+			first_paint, ticks, wall_time = run.execute()
+			counts = first_paint if not timeline else ticks
+			print(
+				name.ljust(24) + module_name.ljust(10) + str(run.ticks).rjust(7)
+				+ "".join(str(counts[column]).rjust(12) for column in columns)
+				+ "{0:.3f}".format(wall_time * 1000).rjust(10)
+			)
+
+
+if __name__ == "__main__":
+	main()
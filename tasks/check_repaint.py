@@ -0,0 +1,67 @@
+import sys
+
+sys.path.insert(0, "tasks")
+from benchmark import load, example_layout, generated_layout, headless
+from replay import example_session
+from headless import *
+
+
+def taps(start: int, keys: list[int], period: int = 8) -> list[tuple[int, int, bool]]:
+	"""Events pressing each key of `keys` in turn for half of `period` ticks, from tick `start`."""
+	events: list[tuple[int, int, bool]] = []
+	for i, key in enumerate(keys):
+		events += [(start + i * period, key, True), (start + i * period + period // 2, key, False)]
+	return events
+
+
+def sessions() -> list[tuple[str, object, list[tuple[int, int, bool]]]]:
+	"""Returns (name, layout builder, events) triplets."""
+	letters = [KEY_EXP + i % 17 for i in range(40)]
+	typing = taps(10, [KEY_DOWN, KEY_RIGHT, KEY_EXE] + letters + [KEY_LEFT] * 30 + [KEY_BACKSPACE] * 5 + letters[:10] + [KEY_RIGHT] * 30 + [KEY_EXE, KEY_OK])
+	sliding = taps(10, [KEY_EXE]) + [(20, KEY_RIGHT, True), (170, KEY_RIGHT, False), (180, KEY_SHIFT, True), (180, KEY_LEFT, True), (240, KEY_LEFT, False), (240, KEY_SHIFT, False)] + taps(250, [KEY_RIGHT, KEY_LEFT, KEY_EXE, KEY_OK])
+	return [
+		("example", example_layout, example_session()),
+		("typing", lambda module: generated_layout(module, 2, 2, 2), typing),
+		("slider", lambda module: generated_layout(module, 2, 2, 2), sliding),
+		("scrolling", lambda module: generated_layout(module, 16, 2, 2), taps(10, [KEY_DOWN] * 20 + [KEY_UP] * 20 + [KEY_OK])),
+	]
+
+
+def check(module, events: list[tuple[int, int, bool]]) -> tuple[int, int]:
+	"""
+	Replays `events`, comparing the screen after each tick with a full
+	repaint of it. Returns the ticks replayed and the ticks that differ.
+	"""
+	replay = headless.Replay(module, events)
+	end_tick = replay.sleep
+	different: list[int] = []
+	def sleep(seconds: float) -> None:
+		incremental = headless.dump()
+		module.damage((0, 0, 320, 222))
+		module.flush_damage()
+		pixels = headless.diff(incremental, headless.dump())
+		if pixels:
+			different.append(replay.tick)
+			if len(different) == 1:
+				headless.save_ppm("incremental_" + str(replay.tick) + ".ppm", incremental)
+		end_tick(seconds)
+	module.sleep = sleep
+
+	headless.clear()
+	replay.run()
+	return replay.tick, len(different)
+
+
+def main() -> None:
+	failed = False
+	for name, build, events in sessions():
+		module = load("gui_src", "src/gui.py")
+		module.layout = build(module)
+		ticks, different = check(module, events)
+		failed = failed or different > 0
+		print(name.ljust(10) + str(ticks).rjust(6) + " ticks, " + str(different) + " differ from a full repaint.")
+	sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,61 @@
+import sys, importlib.util
+
+sys.path.insert(0, "src")
+import headless
+headless.install()
+
+
+def load(name: str, path: str):
+	spec = importlib.util.spec_from_file_location(name, path)
+	module = importlib.util.module_from_spec(spec)
+	spec.loader.exec_module(module)
+	return module
+
+
+def render(module) -> list[bytes]:
+	"""Renders a form's first frame then every widget in every state."""
+	frames: list[bytes] = []
+	
+	module.layout = [
+		[module.Button("I"), module.Button("am"), module.Button("button")],
+		[module.Slider(0, 91, 1), module.Label("46")],
+		[module.Label("Type some text:"), module.TextBox()],
+	]
+	headless.clear()
+	headless.release()
+	# Tap OK every other tick: it is read as pressed after a tick where it wasn't.
+	ticks = [0]
+	def sleep(seconds: float) -> None:
+		ticks[0] += 1
+		if ticks[0] % 2 == 0:
+			headless.tap(headless.KEY_OK)
+	module.sleep = sleep
+	module.start()
+	frames.append(headless.dump())
+	
+	for row in module.layout:
+		for canvas_item in row:
+			for state in range(8):
+				canvas_item.hovered = bool(state & 1)
+				canvas_item.enabled = bool(state & 2)
+				canvas_item.focused = bool(state & 4)
+				canvas_item.draw()
+				frames.append(headless.dump())
+	
+	return frames
+
+
+source_frames = render(load("gui_src", "src/gui.py"))
+minified_frames = render(load("gui_minified", "minified/gui.py"))
+
+different: int = 0
+for i, (source, minified) in enumerate(zip(source_frames, minified_frames)):
+	pixels = headless.diff(source, minified)
+	if pixels:
+		different += 1
+		print("Frame " + str(i) + ": " + str(pixels) + " pixels differ")
+		headless.save_ppm("src_" + str(i) + ".ppm", source)
+		headless.save_ppm("minified_" + str(i) + ".ppm", minified)
+
+print(str(len(source_frames)) + " frames compared, " + str(different) + " different.")
+sys.exit(1 if different else 0)
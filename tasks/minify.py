@@ -1,23 +1,290 @@
+import sys, ast, math, marshal, time, tracemalloc, importlib.util
 import python_minifier
-import python_minifier.ministring
 
-minified_string: str
+sys.path.insert(0, "src")
+import headless
+headless.install()
 
-with open("src/gui.py", "r", encoding="utf-8") as file:
-	minified_string = file.read()
 
-print("Source:")
-print(minified_string)
+SOURCE: str = "src/gui.py"
+VARIANTS: dict[str, tuple[list[str], str, list[str]]] = {
+	# output name: (widgets, base style, features)
+	"gui_buttons": (["Label", "Button"], "MODERN_STYLE", []),
+	"gui_inputs": (["Label", "Slider", "TextBox"], "MODERN_STYLE", []),
+	"gui_classic": (["Label", "Button", "Slider", "TextBox"], "CLASSIC_STYLE", ["pages", "lazy_rows"]),
+}
+"""Trimmed builds written next to the full minified/gui.py."""
+ROOTS: list[str] = ["start", "layout", "Config", "Style", "Colors", "set_base_style"]
+"""Names every variant keeps, whether the widgets use them or not."""
+FEATURES: dict[str, tuple[list[str], dict[str, bool], list[str]]] = {
+	# feature: (names kept with it, tests folded without it, names whose calls are removed without it)
+	"pages": (["Page", "Form", "show_page"], {"_next_page is not None": False}, []),
+	# Without it, LazyRows is removed, so `isinstance()` checks against it are false.
+	"lazy_rows": (["LazyRows"], {}, []),
+	"tasks": (["spawn", "cancel"], {"_tasks": False}, ["_tasks"]),
+	"record_input": (["record_input", "stop_recording_input"], {"_recorded_input is not None": False}, []),
+	"profile": (["Profile"], {"Profile.enabled": False}, []),
+	"tick_timing": (["TickTiming"], {}, ["TickTiming"]),
+}
+"""Optional subsystems, left out of the variants that don't list them."""
+SHAKEN_STAR_IMPORTS: dict[str, object] = {"math": math}
+"""`from ... import *` removed when no name of the module is used."""
 
-minified_string = python_minifier.minify(
-	minified_string,
-	"src/gui.py",
-)
 
-print("Minified:")
-print(minified_string)
+def load(name: str, path: str):
+	spec = importlib.util.spec_from_file_location(name, path)
+	module = importlib.util.module_from_spec(spec)
+	spec.loader.exec_module(module)
+	return module
 
-with open("minified/gui.py", "w", encoding="utf-8") as file:
-	file.write(minified_string)
 
-print("Finished ♥♥♥♥ !")
\ No newline at end of file
+def used_names(node: ast.AST) -> set[str]:
+	"""Names read by `node`, and globals it declares, which must be defined even if only assigned."""
+	names = {child.id for child in ast.walk(node) if isinstance(child, ast.Name) and isinstance(child.ctx, ast.Load)}
+	for child in ast.walk(node):
+		if isinstance(child, ast.Global):
+			names.update(child.names)
+	return names
+
+def defined_names(statement: ast.stmt) -> set[str]:
+	if isinstance(statement, (ast.ClassDef, ast.FunctionDef)):
+		return {statement.name}
+	if isinstance(statement, ast.Assign):
+		return {target.id for target in statement.targets if isinstance(target, ast.Name)}
+	if isinstance(statement, ast.AnnAssign) and isinstance(statement.target, ast.Name):
+		return {statement.target.id}
+	return set()
+
+def is_literal(statement: ast.stmt) -> bool:
+	return isinstance(statement, ast.Expr) and isinstance(statement.value, ast.Constant)
+
+def is_main_block(statement: ast.stmt) -> bool:
+	return isinstance(statement, ast.If) and "__name__" in used_names(statement.test)
+
+
+class Trimmer(ast.NodeTransformer):
+	"""
+	Strips annotations and docstrings, and makes `isinstance()` checks
+	against the `removed` classes false, as well as the `folded` tests,
+	dropping the branches they guard. Calls of `dropped` names, or of their
+	methods, are removed when they are statements. The folded tests and
+	dropped names found are added to `matched`.
+	"""
+
+	def __init__(self, removed: set[str], folded: dict[str, bool] = {}, dropped: set[str] = set()) -> None:
+		self.removed = removed
+		self.folded = folded
+		self.dropped = dropped
+		self.matched: set[str] = set()
+
+	def fold(self, test: ast.expr) -> ast.expr:
+		source = ast.unparse(test)
+		if source in self.folded:
+			self.matched.add(source)
+			return ast.Constant(self.folded[source])
+		return test
+
+	def visit_BoolOp(self, node: ast.BoolOp) -> ast.AST:
+		self.generic_visit(node)
+		node.values = [self.fold(value) for value in node.values]
+		if isinstance(node.op, ast.And) and any(isinstance(value, ast.Constant) and value.value is False for value in node.values):
+			return ast.Constant(False)
+		return node
+
+	def visit_Expr(self, node: ast.Expr) -> ast.AST:
+		self.generic_visit(node)
+		call = node.value
+		if isinstance(call, ast.Call):
+			func = call.func.value if isinstance(call.func, ast.Attribute) else call.func
+			if isinstance(func, ast.Name) and func.id in self.dropped:
+				self.matched.add(func.id)
+				return None
+		return node
+
+	def visit_Call(self, node: ast.Call) -> ast.AST:
+		self.generic_visit(node)
+		if isinstance(node.func, ast.Name) and node.func.id == "isinstance" and isinstance(node.args[1], ast.Name) and node.args[1].id in self.removed:
+			return ast.Constant(False)
+		return node
+
+	def visit_If(self, node: ast.If) -> ast.AST:
+		self.generic_visit(node)
+		node.test = self.fold(node.test)
+		if isinstance(node.test, ast.Constant) and node.test.value is False:
+			return node.orelse or ast.Pass()
+		node.body = node.body or [ast.Pass()]
+		return node
+
+	def visit_AnnAssign(self, node: ast.AnnAssign) -> ast.AST:
+		if node.value is None:
+			return None
+		return self.visit(ast.Assign(targets=[node.target], value=node.value, lineno=node.lineno))
+
+	def visit_arg(self, node: ast.arg) -> ast.AST:
+		node.annotation = None
+		return node
+
+	def visit_FunctionDef(self, node: ast.FunctionDef) -> ast.AST:
+		node.returns = None
+		return self.visit_body(node)
+
+	def visit_ClassDef(self, node: ast.ClassDef) -> ast.AST:
+		return self.visit_body(node)
+
+	def visit_body(self, node: ast.AST) -> ast.AST:
+		self.generic_visit(node)
+		node.body = [statement for statement in node.body if not is_literal(statement)] or [ast.Pass()]
+		return node
+
+
+def subclasses_of(tree: ast.Module, base: str) -> dict[str, list[str]]:
+	"""Returns the top-level classes deriving from `base`, with their direct bases."""
+	classes = {statement.name: [b.id for b in statement.bases if isinstance(b, ast.Name)] for statement in tree.body if isinstance(statement, ast.ClassDef)}
+	def derives(name: str) -> bool:
+		return name == base or any(derives(parent) for parent in classes.get(name, []))
+	return {name: bases for name, bases in classes.items() if derives(name)}
+
+def with_bases(names: list[str], classes: dict[str, list[str]]) -> set[str]:
+	result: set[str] = set()
+	pending = list(names)
+	while pending:
+		name = pending.pop()
+		if name not in result:
+			result.add(name)
+			pending += classes.get(name, [])
+	return result
+
+
+def used_style_keys(widgets: list[str], style_name: str) -> set[str]:
+	"""Returns the entries of the style that the colors of `widgets` resolve through, in every state."""
+	module = load("gui_styles", SOURCE)
+	style = getattr(module, style_name)
+	keys: set[str] = set()
+	resolve = module.Style._resolve
+	def recording_resolve(self, color_name):
+		if hasattr(self, str(color_name)):
+			keys.add(str(color_name))
+		return resolve(self, color_name)
+	module.Style._resolve = recording_resolve
+
+	for widget in widgets:
+		cls = getattr(module, widget)
+		for state in range(module.State.COUNT):
+			if state & ~cls._STATE_MASK == 0:
+				for color_name in (module.Colors.text, module.Colors.border, module.Colors.background, module.Colors.screen):
+					style.get(color_name.for_state(state | cls._STATE_FLAGS))
+	style.get(module.Colors.screen)
+	return keys
+
+def trim_style(tree: ast.Module, style_name: str, keys: set[str]) -> None:
+	"""Makes `style_name` the base style and removes its entries outside of `keys`."""
+	namespace = {}
+	exec(compile(ast.Module(body=[s for s in tree.body if isinstance(s, ast.ClassDef) and s.name in ("ColorName", "State", "Colors")] + [ast.parse("_VARIANT_DELIMITER = '/'").body[0]], type_ignores=[]), SOURCE, "exec"), namespace)
+	for statement in tree.body:
+		if isinstance(statement, ast.Expr) and isinstance(statement.value, ast.Call) and getattr(statement.value.func, "id", None) == "set_base_style":
+			statement.value.args = [ast.Name(style_name, ast.Load())]
+		if style_name in defined_names(statement):
+			colors = statement.value.args[1]
+			kept = [(key, value) for key, value in zip(colors.keys, colors.values) if str(eval(compile(ast.Expression(key), SOURCE, "eval"), namespace)) in keys]
+			colors.keys = [key for key, value in kept]
+			colors.values = [value for key, value in kept]
+
+
+def shake(tree: ast.Module, roots: set[str]) -> None:
+	"""Removes the top-level definitions nothing kept refers to."""
+	definitions: dict[str, list[ast.stmt]] = {}
+	for statement in tree.body:
+		for name in defined_names(statement):
+			definitions.setdefault(name, []).append(statement)
+
+	kept: list[ast.stmt] = [statement for statement in tree.body if not defined_names(statement) and not isinstance(statement, ast.ImportFrom)]
+	needed: set[str] = set(roots)
+	pending: list[str] = list(roots)
+	for statement in kept:
+		pending += used_names(statement)
+	while pending:
+		name = pending.pop()
+		for statement in definitions.get(name, []):
+			if statement not in kept:
+				kept.append(statement)
+				pending += used_names(statement)
+		needed.add(name)
+
+	body: list[ast.stmt] = []
+	for statement in tree.body:
+		if isinstance(statement, ast.ImportFrom):
+			module = SHAKEN_STAR_IMPORTS.get(statement.module)
+			if statement.names[0].name == "*" and module and not needed & set(dir(module)):
+				continue
+			body.append(statement)
+		elif statement in kept:
+			body.append(statement)
+	tree.body = body
+
+
+def trimmed_source(widgets: list[str], style_name: str, features: list[str]) -> str:
+	with open(SOURCE, "r", encoding="utf-8") as file:
+		tree = ast.parse(file.read(), SOURCE)
+
+	tree.body = [statement for statement in tree.body if not is_main_block(statement)]
+	classes = subclasses_of(tree, "CanvasItem")
+	removed = set(classes) - with_bases(widgets, classes)
+	roots = ROOTS + widgets
+	folded: dict[str, bool] = {}
+	dropped: set[str] = set()
+	for feature, (names, feature_folded, feature_dropped) in FEATURES.items():
+		if feature in features:
+			roots += names
+		else:
+			folded.update(feature_folded)
+			dropped.update(feature_dropped)
+	if "lazy_rows" not in features:
+		removed.add("LazyRows")
+	trim_style(tree, style_name, used_style_keys(widgets, style_name))
+	trimmer = Trimmer(removed, folded, dropped)
+	tree = trimmer.visit(tree)
+	unmatched = (set(folded) | dropped) - trimmer.matched
+	if unmatched:
+		# The source changed: the feature would silently stay in the build.
+		raise RuntimeError("minify: not found in " + SOURCE + ": " + ", ".join(sorted(unmatched)))
+	tree.body = [statement for statement in tree.body if not is_literal(statement)]
+	ast.fix_missing_locations(tree)
+	shake(tree, set(roots))
+	return ast.unparse(tree)
+
+
+def report(path: str) -> tuple[int, int, float, int]:
+	"""Returns the source size, compiled size, import time in ms and heap after import in bytes of a build."""
+	with open(path, "r", encoding="utf-8") as file:
+		source = file.read()
+	compiled = len(marshal.dumps(compile(source, path, "exec")))
+
+	tracemalloc.start()
+	import_time = time.perf_counter()
+	load("gui_report", path)
+	import_time = time.perf_counter() - import_time
+	heap = tracemalloc.get_traced_memory()[0]
+	tracemalloc.stop()
+	return len(source.encode()), compiled, import_time * 1000, heap
+
+
+def main() -> None:
+	with open(SOURCE, "r", encoding="utf-8") as file:
+		builds: dict[str, str] = {"gui": python_minifier.minify(file.read(), SOURCE)}
+	for name, (widgets, style_name, features) in VARIANTS.items():
+		builds[name] = python_minifier.minify(trimmed_source(widgets, style_name, features), SOURCE)
+
+	print("build".ljust(16) + "source".rjust(10) + "compiled".rjust(10) + "import ms".rjust(11) + "heap".rjust(10))
+	for name in ["src"] + list(builds):
+		path = SOURCE if name == "src" else "minified/" + name + ".py"
+		if name != "src":
+			with open(path, "w", encoding="utf-8") as file:
+				file.write(builds[name])
+		source, compiled, import_time, heap = report(path)
+		print(name.ljust(16) + str(source).rjust(10) + str(compiled).rjust(10) + "{0:.2f}".format(import_time).rjust(11) + str(heap).rjust(10))
+
+	print("Finished ♥♥♥♥ !")
+
+
+if __name__ == "__main__":
+	main()
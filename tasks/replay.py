@@ -0,0 +1,52 @@
+import sys, json
+
+sys.path.insert(0, "tasks")
+from benchmark import MODULES, load, example_layout, headless
+from headless import *
+
+
+def example_session() -> list[tuple[int, int, bool]]:
+	"""Presses buttons, drags the slider and types some text in `example_layout()`."""
+	keys = [
+		KEY_RIGHT, KEY_EXE, KEY_DOWN, KEY_EXE, KEY_RIGHT, KEY_RIGHT, KEY_LEFT, KEY_EXE,
+		KEY_DOWN, KEY_RIGHT, KEY_EXE, KEY_EXP, KEY_FOUR, KEY_ONE, KEY_LEFT, KEY_BACKSPACE, KEY_EXE,
+		KEY_OK,
+	]
+	events: list[tuple[int, int, bool]] = []
+	for i, key in enumerate(keys):
+		events += [(10 + i * 8, key, True), (14 + i * 8, key, False)]
+	return events
+
+
+def main() -> None:
+	"""
+	Replays a session, by default `example_session()`, else the JSON list of
+	[tick, key, held, seconds] events in the file given as argument, as printed
+	from `gui.record_input()` on the calculator. The form is `example_layout()`.
+	"""
+	if len(sys.argv) > 1:
+		with open(sys.argv[1], "r", encoding="utf-8") as file:
+			events = [tuple(event) for event in json.load(file)]
+	else:
+		events = example_session()
+
+	print("module".ljust(10) + "ticks".rjust(7) + "draw calls".rjust(12) + "pixels".rjust(10) + "keydown".rjust(10) + "latency".rjust(9) + "max".rjust(5) + "  result")
+	for module_name, path in MODULES.items():
+		module = load("gui_" + module_name, path)
+		module.layout = example_layout(module)
+		headless.clear()
+		replay = headless.Replay(module, events)
+		result = replay.run()
+
+		draws = sum(headless.counters.get(name, (0, 0))[0] for name in ("fill_rect", "draw_string", "set_pixel"))
+		latencies = [ticks for tick, key, ticks, polls in replay.latencies if ticks is not None]
+		print(
+			module_name.ljust(10) + str(replay.tick).rjust(7) + str(draws).rjust(12)
+			+ str(headless.pixels_written()).rjust(10) + str(headless.counters.get("keydown", (0, 0))[0]).rjust(10)
+			+ "{0:.2f}".format(sum(latencies) / max(1, len(latencies))).rjust(9) + str(max(latencies, default=0)).rjust(5)
+			+ "  " + str(result)
+		)
+
+
+if __name__ == "__main__":
+	main()